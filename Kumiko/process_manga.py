@@ -21,10 +21,42 @@ import subprocess
 import shutil
 import zipfile
 import argparse
+import atexit
 import json
+import logging
+import mmap
+import queue
+import re
+import struct
 import cv2
+import numpy as np
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 # ============================================================================
 # SCHEMA DEFINITIONS (for reference, not enforced)
@@ -40,36 +72,52 @@ class PanelCoordinates:
 
 # Page data schema
 class PageData:
-    def __init__(self, page: int, image: str, panels: List[PanelCoordinates]):
+    def __init__(self, page: int, image: str, panels: Union[List[PanelCoordinates], np.ndarray]):
         self.page = page
         self.image = image
+        if isinstance(panels, np.ndarray):
+            panels = [PanelCoordinates(*row) for row in panels.reshape(-1, 4).tolist()]
         self.panels = panels
     
+    def panel_array(self) -> np.ndarray:
+        """Panels as a new (N, 4) float64 x/y/w/h array; editing it does not change self.panels."""
+        return np.array([(p.x, p.y, p.w, p.h) for p in self.panels], dtype=np.float64).reshape(-1, 4)
+    
     def panel_count(self) -> int:
         """Return the number of panels on this page."""
         return len(self.panels)
     
     def total_panel_area(self) -> float:
         """Calculate total area covered by panels on this page."""
-        return sum(panel.w * panel.h for panel in self.panels)
+        panels = self.panel_array()
+        return float(panels[:, 2].dot(panels[:, 3]))
 
 # Chapter data schema
 class ChapterData:
-    def __init__(self, reading_direction: str, total_pages: int, pages: List[PageData]):
+    def __init__(self, reading_direction: str, total_pages: int, pages: Sequence[PageData]):
         self.reading_direction = reading_direction
         self.total_pages = total_pages
         self.pages = pages
     
+    @property
+    def pages(self) -> Tuple[PageData, ...]:
+        """Pages as a tuple, so the page-number index can't go stale; assign a new sequence to change them."""
+        return self._pages
+    
+    @pages.setter
+    def pages(self, pages: Sequence[PageData]):
+        self._pages = tuple(pages)
+        self._by_num = {}
+        for page in self._pages:
+            self._by_num.setdefault(page.page, page)  # first match wins, as with a linear scan
+    
     def get_page(self, page_num: int) -> Optional[PageData]:
         """Get page data by page number."""
-        for page in self.pages:
-            if page.page == page_num:
-                return page
-        return None
+        return self._by_num.get(page_num)
     
     def total_panels(self) -> int:
         """Get total number of panels across all pages."""
-        return sum(page.panel_count() for page in self.pages)
+        return sum(page.panel_count() for page in self._pages)
 
 # Manga index schema
 class MangaIndex:
@@ -83,6 +131,88 @@ class MangaIndex:
 # UTILITY FUNCTIONS
 # ============================================================================
 
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'})
+# Page images looked up by stem, in priority order, each followed by its upper-case spelling
+SIDECAR_IMAGE_SUFFIXES = tuple(s for ext in ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp') for s in (ext, ext.upper()))
+# (lower, upper) suffix pairs tried for an HTML page's image, in priority order
+HTML_IMAGE_SUFFIXES = tuple((ext, ext.upper()) for ext in ('.jpg', '.jpeg', '.png'))
+HTML_IMAGE_EXTENSIONS = frozenset(ext for ext, _ in HTML_IMAGE_SUFFIXES)
+
+# Progress goes through logging: per-panel and per-match lines at DEBUG (--verbose), everything but errors off with --quiet
+log = logging.getLogger("panelreader")
+
+# Kumiko runs (one python3 process each, OpenCV on the CPU) in flight at once
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# The Kumiko checkout this script lives in: kumiko runs from here, Pages/ and panel_result/ live here
+KUMIKO_DIR = Path(__file__).parent
+KUMIKO_CMD = ('python3', 'kumiko')
+
+# --compact: write the output JSON without indentation (set by main())
+COMPACT_JSON = False
+
+# Images per Kumiko call, bounded so the command line fits everywhere (Windows: 32K chars)
+MAX_BATCH_IMAGES = 500
+MAX_BATCH_ARGV_CHARS = 30000
+
+# Below this a plain read() is cheaper than setting up a mapping
+MMAP_MIN_BYTES = 1 << 16
+
+def load_json(path):
+    """Read a JSON file, via orjson when installed (straight from a memory map for larger files)."""
+    with open(path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return orjson.loads(view)
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def dump_json(obj, path):
+    """Write a JSON file indented by 2 (compact with COMPACT_JSON), via orjson when installed."""
+    if COMPACT_JSON:
+        data = compact_json(obj).encode('utf-8')
+    elif orjson is not None:
+        # NON_STR_KEYS: stringify int keys the way json.dump does instead of raising
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(data)
+
+def compact_json(obj):
+    """One-line JSON text with no spaces, via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+def dump_pages_json(reading_direction, pages, path):
+    """Write {"reading_direction", "total_pages", "pages"} exactly as dump_json would, serializing page by page.
+
+    Only one page's JSON is held at a time instead of the encoded bytes of the whole chapter.
+    """
+    if COMPACT_JSON:
+        with open(path, 'wb', buffering=1 << 20) as f:
+            f.write(b'{"reading_direction":%s,"total_pages":%d,"pages":[' % (compact_json(reading_direction).encode('utf-8'), len(pages)))
+            for i, page in enumerate(pages):
+                if i:
+                    f.write(b',')
+                f.write(compact_json(page).encode('utf-8'))
+            f.write(b']}')
+        return
+    
+    if orjson is not None:
+        encode = lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        encode = lambda obj: json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(b'{\n  "reading_direction": %s,\n  "total_pages": %d,\n  "pages": [' % (encode(reading_direction), len(pages)))
+        for i, page in enumerate(pages):
+            # Re-indent the page to its depth in the document; encoded strings never hold a raw newline
+            f.write(b',\n    ' if i else b'\n    ')
+            f.write(encode(page).replace(b'\n', b'\n    '))
+        f.write(b'\n  ]\n}' if pages else b']\n}')
+
 def export_schema(output_file: str = "manga_schema.json"):
     """Export basic schema structure to JSON file for documentation."""
     schema = {
@@ -115,171 +245,261 @@ def export_schema(output_file: str = "manga_schema.json"):
     }
     
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(schema, f, indent=2, ensure_ascii=False)
-        print(f"📄 Schema exported to {output_file}")
+        dump_json(schema, output_file)
+        log.info(f"📄 Schema exported to {output_file}")
         return True
     except Exception as e:
-        print(f"❌ Failed to export schema: {e}")
+        log.error(f"❌ Failed to export schema: {e}")
         return False
 
+MASTER_FIELDS = ('archive_name', 'total_chapters', 'chapters', 'reading_direction')
+CHAPTER_FIELDS = ('reading_direction', 'total_pages', 'pages')
+
+# From this size validate_json_file streams the top-level keys with ijson instead of loading the document
+STREAM_VALIDATE_MIN_BYTES = 1 << 14
+
+def _top_level_keys(json_file):
+    """Top-level keys of a JSON file via ijson, stopping once the required fields are seen. None if not an object."""
+    keys = set()
+    with open(json_file, 'rb') as f:
+        events = ijson.parse(f)
+        if next(events)[1] != 'start_map':
+            return None
+        for prefix, event, value in events:
+            if prefix == '' and event == 'map_key':
+                keys.add(value)
+                if (all(field in keys for field in MASTER_FIELDS)
+                        or (all(field in keys for field in CHAPTER_FIELDS) and 'archive_name' not in keys)):
+                    break
+    return keys
+
 def validate_json_file(json_file: Path) -> bool:
     """Validate a single JSON file against the basic schema structure."""
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if ijson is not None and json_file.stat().st_size >= STREAM_VALIDATE_MIN_BYTES:
+            fields = _top_level_keys(json_file)
+        else:
+            data = load_json(json_file)
+            fields = data if isinstance(data, dict) else None
         
         # Basic structure validation without Pydantic
-        if not isinstance(data, dict):
-            print(f"❌ {json_file.name} - Invalid JSON structure (not a dict)")
+        if fields is None:
+            log.error(f"❌ {json_file.name} - Invalid JSON structure (not a dict)")
             return False
         
         # Check for master index structure
-        if 'archive_name' in data and 'chapters' in data:
-            required_fields = ['archive_name', 'total_chapters', 'chapters', 'reading_direction']
-            for field in required_fields:
-                if field not in data:
-                    print(f"❌ {json_file.name} - Missing required field: {field}")
+        if 'archive_name' in fields and 'chapters' in fields:
+            for field in MASTER_FIELDS:
+                if field not in fields:
+                    log.error(f"❌ {json_file.name} - Missing required field: {field}")
                     return False
         else:
             # Check for chapter structure
-            required_fields = ['reading_direction', 'total_pages', 'pages']
-            for field in required_fields:
-                if field not in data:
-                    print(f"❌ {json_file.name} - Missing required field: {field}")
+            for field in CHAPTER_FIELDS:
+                if field not in fields:
+                    log.error(f"❌ {json_file.name} - Missing required field: {field}")
                     return False
         
-        print(f"✅ {json_file.name} - Valid structure")
+        log.info(f"✅ {json_file.name} - Valid structure")
         return True
         
     except Exception as e:
-        print(f"❌ {json_file.name} - Error reading file: {e}")
+        log.error(f"❌ {json_file.name} - Error reading file: {e}")
         return False
 
+def _dir_names(directory):
+    """Names of the entries in directory from one scandir, empty if it cannot be listed."""
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
+def _panel_stats(panels):
+    """(panel count, summed w*h) for one page's normalized panels."""
+    if not panels:
+        return 0, 0.0
+    widths = np.fromiter((panel.get('w', 0) for panel in panels), dtype=np.float64, count=len(panels))
+    heights = np.fromiter((panel.get('h', 0) for panel in panels), dtype=np.float64, count=len(panels))
+    return len(panels), float(widths.dot(heights))
+
+def _process_one_json(json_file, page_num, dir_names=None):
+    """Read and preprocess one Kumiko JSON file. Returns (pages, panel_count, area_sum).
+
+    dir_names is _dir_names(json_file.parent), listed once per folder by the caller.
+    """
+    pages = []
+    panel_count = 0
+    area_sum = 0.0
+    try:
+        data = load_json(json_file)
+        
+        # Try to find the corresponding image file for dimension reading
+        image_path = None
+        json_stem = json_file.stem
+        names = dir_names if dir_names is not None else _dir_names(json_file.parent)
+        # Look for image file with same name in common locations
+        for suffix in SIDECAR_IMAGE_SUFFIXES:
+            if json_stem + suffix in names:
+                image_path = json_file.parent / (json_stem + suffix)
+                break
+        
+        # Handle single page JSON or array of pages
+        if isinstance(data, list):
+            # Array of page data
+            candidates = [(page_data, page_num) for page_data in data]
+        elif isinstance(data, dict) and 'pages' in data:
+            # Multi-page JSON structure
+            candidates = [(page_data, i + 1) for i, page_data in enumerate(data['pages'])]
+        elif isinstance(data, dict):
+            # Single page JSON structure
+            candidates = [(data, page_num)]
+        else:
+            candidates = []
+        
+        for page_data, number in candidates:
+            if 'panels' in page_data and page_data['panels']:
+                # Convert field names and panel formats
+                processed_data = preprocess_page_data(page_data, number, image_path)
+                if processed_data:
+                    # Add processed data directly (no Pydantic validation)
+                    pages.append(processed_data)
+                    count, area = _panel_stats(processed_data.get('panels', []))
+                    panel_count += count
+                    area_sum += area
+        
+    except Exception as e:
+        log.warning(f"   ⚠️  Error reading {json_file}: {e}")
+    
+    return pages, panel_count, area_sum
+
+def _in_order(items, key=None):
+    """True when items are already non-decreasing (by key), so sorting them would be a no-op."""
+    keys = items if key is None else [key(item) for item in items]
+    return all(a <= b for a, b in zip(keys, keys[1:]))
+
 def combine_jsons_to_json(json_files, output_json, chapter_name=None):
-    """Combine multiple JSON files into a single JSON with basic structure validation."""
+    """Combine multiple JSON files into a single JSON with basic structure validation.
+
+    Returns (success, total_pages).
+    """
     pages_data = []
     reading_direction = "rtl"  # Default to RTL for manga
     total_panels_found = 0
     total_area_covered = 0.0
     
-    print(f"🔄 Processing {len(json_files)} JSON files with schema validation...")
+    log.info(f"🔄 Processing {len(json_files)} JSON files with schema validation...")
     
-    for page_num, json_file in enumerate(sorted(json_files), 1):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Try to find the corresponding image file for dimension reading
-            image_path = None
-            json_stem = json_file.stem
-            # Look for image file with same name in common locations
-            for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-                potential_image = json_file.parent / f"{json_stem}{ext}"
-                if potential_image.exists():
-                    image_path = potential_image
-                    break
-                potential_image = json_file.parent / f"{json_stem}{ext.upper()}"
-                if potential_image.exists():
-                    image_path = potential_image
-                    break
-            
-            # Handle single page JSON or array of pages
-            if isinstance(data, list):
-                # Array of page data
-                for page_data in data:
-                    if 'panels' in page_data and page_data['panels']:
-                        # Convert field names and panel formats
-                        processed_data = preprocess_page_data(page_data, page_num, image_path)
-                        if processed_data:
-                            # Add processed data directly (no Pydantic validation)
-                            pages_data.append(processed_data)
-                            # Calculate statistics
-                            panel_count = len(processed_data.get('panels', []))
-                            total_panels_found += panel_count
-                            total_area_covered += sum(
-                                panel.get('w', 0) * panel.get('h', 0) 
-                                for panel in processed_data.get('panels', [])
-                            )
-                            
-            elif isinstance(data, dict):
-                if 'pages' in data:
-                    # Multi-page JSON structure
-                    for i, page_data in enumerate(data['pages']):
-                        if 'panels' in page_data and page_data['panels']:
-                            # Convert field names and panel formats
-                            processed_data = preprocess_page_data(page_data, i + 1, image_path)
-                            if processed_data:
-                                # Add processed data directly (no Pydantic validation)
-                                pages_data.append(processed_data)
-                                # Calculate statistics
-                                panel_count = len(processed_data.get('panels', []))
-                                total_panels_found += panel_count
-                                total_area_covered += sum(
-                                    panel.get('w', 0) * panel.get('h', 0) 
-                                    for panel in processed_data.get('panels', [])
-                                )
-                                    
-                elif 'panels' in data and data['panels']:
-                    # Single page JSON structure
-                    # Convert field names and panel formats
-                    processed_data = preprocess_page_data(data, page_num, image_path)
-                    if processed_data:
-                        # Add processed data directly (no Pydantic validation)
-                        pages_data.append(processed_data)
-                        # Calculate statistics
-                        panel_count = len(processed_data.get('panels', []))
-                        total_panels_found += panel_count
-                        total_area_covered += sum(
-                            panel.get('w', 0) * panel.get('h', 0) 
-                            for panel in processed_data.get('panels', [])
-                        )
-            
-        except Exception as e:
-            print(f"   ⚠️  Error reading {json_file}: {e}")
-            continue
+    # Image siblings are looked up in one listing per folder rather than with exists() per candidate
+    json_files = list(json_files)
+    if not _in_order(json_files):
+        json_files.sort()
+    listings = {folder: _dir_names(folder) for folder in {json_file.parent for json_file in json_files}}
     
-    if not pages_data:
-        print(f"   ❌ No valid page data found in JSON files")
-        return False
+    # Files are independent: read, parse and normalize them side by side, then merge in order
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        results = pool.map(lambda json_file, page_num: _process_one_json(json_file, page_num, listings[json_file.parent]),
+                           json_files, range(1, len(json_files) + 1))
+        for pages, panel_count, area in results:
+            pages_data.extend(pages)
+            total_panels_found += panel_count
+            total_area_covered += area
     
-    # Sort pages by page number (cleaner math with lambda)
-    pages_data.sort(key=lambda x: x.get('page', 0))
+    if not pages_data:
+        log.error(f"   ❌ No valid page data found in JSON files")
+        return False, 0
     
-    # Create output structure without Pydantic
-    output_data = {
-        "reading_direction": reading_direction,
-        "total_pages": len(pages_data),
-        "pages": pages_data
-    }
+    # Sort pages by page number; preprocess_page_data gives every page one, and they usually arrive in order
+    if not _in_order(pages_data, key=itemgetter('page')):
+        pages_data.sort(key=itemgetter('page'))
     
     # Additional statistics with cleaner math
     avg_panels_per_page = total_panels_found / len(pages_data) if pages_data else 0
     avg_area_per_panel = total_area_covered / total_panels_found if total_panels_found > 0 else 0
     
-    print(f"   📊 Statistics:")
-    print(f"      - Total pages: {len(pages_data)}")
-    print(f"      - Total panels: {total_panels_found}")
-    print(f"      - Avg panels/page: {avg_panels_per_page:.2f}")
-    print(f"      - Total area coverage: {total_area_covered:.3f}")
-    print(f"      - Avg area/panel: {avg_area_per_panel:.6f}")
-    
-    # Create output structure without shrink-wrapping
-    output_data = {
-        "reading_direction": reading_direction,
-        "total_pages": len(pages_data),
-        "pages": pages_data
-    }
+    log.info(f"   📊 Statistics:")
+    log.info(f"      - Total pages: {len(pages_data)}")
+    log.info(f"      - Total panels: {total_panels_found}")
+    log.info(f"      - Avg panels/page: {avg_panels_per_page:.2f}")
+    log.info(f"      - Total area coverage: {total_area_covered:.3f}")
+    log.info(f"      - Avg area/panel: {avg_area_per_panel:.6f}")
     
-    # Write output JSON
+    # Write output JSON, one page at a time
     try:
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        print(f"   ✅ Combined {len(json_files)} JSON files into {output_json}")
-        return True
+        dump_pages_json(reading_direction, pages_data, output_json)
+        log.info(f"   ✅ Combined {len(json_files)} JSON files into {output_json}")
+        return True, len(pages_data)
     except Exception as e:
-        print(f"   ❌ Error writing {output_json}: {e}")
-        return False
+        log.error(f"   ❌ Error writing {output_json}: {e}")
+        return False, 0
+
+# One read of this many bytes reaches the SOF segment of any JPEG without an oversized EXIF block
+IMAGE_HEADER_BYTES = 1 << 16
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic); C4/C8/CC are not frames
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def prefetch_headers(paths, nbytes=IMAGE_HEADER_BYTES):
+    """Ask the kernel to start reading the first nbytes of each file now (POSIX only, best effort).
+
+    The later header reads then find those pages already cached instead of waiting on disk one file at a time.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, nbytes, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+def read_header_size(image_path):
+    """(width, height) of a PNG or JPEG from a single read of its header, or None to fall back to PIL."""
+    with open(image_path, 'rb', buffering=0) as f:
+        head = f.read(IMAGE_HEADER_BYTES)
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    if not head.startswith(b'\xff\xd8'):
+        return None
+    # Walk the JPEG segments up to the first SOF
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # no length field
+            pos += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            if pos + 9 > len(head):
+                return None
+            height, width = struct.unpack('>HH', head[pos + 5:pos + 9])
+            return (width, height) if width and height else None
+        pos += 2 + struct.unpack('>H', head[pos + 2:pos + 4])[0]
+    return None
+
+_PANEL_KEYS = frozenset('xywh')
+
+def _norm_list_panels(panels, img_width, img_height):
+    """Pixel [x, y, w, h] lists (the usual Kumiko output) to normalized dicts, in one array division."""
+    coords = np.array([panel[:4] for panel in panels], dtype=np.float64).reshape(-1, 4)
+    coords /= (img_width, img_height, img_width, img_height)
+    return [{'x': x, 'y': y, 'w': w, 'h': h} for x, y, w, h in coords.tolist()]
+
+def _norm_dict_panels(panels, img_width, img_height):
+    """{'x', 'y', 'w', 'h'} dicts: normalize in place the ones still in pixels."""
+    for panel in panels:
+        x, y, w, h = float(panel['x']), float(panel['y']), float(panel['w']), float(panel['h'])
+        if x > 1 or y > 1 or w > 1 or h > 1:
+            panel['x'], panel['y'], panel['w'], panel['h'] = x / img_width, y / img_height, w / img_width, h / img_height
+    return panels
 
 def preprocess_page_data(page_data, page_num, image_path=None):
     """Preprocess page data to match Pydantic schema requirements."""
@@ -300,19 +520,31 @@ def preprocess_page_data(page_data, page_num, image_path=None):
         if 'size' in page_data and isinstance(page_data['size'], list) and len(page_data['size']) >= 2:
             img_width, img_height = page_data['size'][0], page_data['size'][1]
         elif image_path and image_path.exists():
-            # Try to read actual image file dimensions
+            # Try to read actual image file dimensions, from the PNG/JPEG header when possible
             try:
-                from PIL import Image
-                with Image.open(image_path) as img:
-                    img_width, img_height = img.size
-                    print(f"   📐 Read image dimensions from {image_path.name}: {img_width}x{img_height}")
+                size = read_header_size(image_path)
+                if size is None:
+                    if Image is None:
+                        raise ImportError("No module named 'PIL'")
+                    with Image.open(image_path) as img:
+                        size = img.size
+                img_width, img_height = size
+                log.info(f"   📐 Read image dimensions from {image_path.name}: {img_width}x{img_height}")
             except ImportError:
-                print(f"   ⚠️  PIL/Pillow not available, cannot read image dimensions")
+                log.warning(f"   ⚠️  PIL/Pillow not available, cannot read image dimensions")
             except Exception as e:
-                print(f"   ⚠️  Could not read image {image_path}: {e}")
+                log.warning(f"   ⚠️  Could not read image {image_path}: {e}")
         
         # Convert panel lists to dictionaries and normalize coordinates
-        if 'panels' in page_data and isinstance(page_data['panels'], list):
+        panels = page_data.get('panels')
+        has_size = bool(img_width and img_height and img_width > 0 and img_height > 0)
+        # Pick the panel layout once per page; mixed pages and pages without a size take the general loop
+        if has_size and isinstance(panels, list) and all(isinstance(panel, list) and len(panel) >= 4 for panel in panels):
+            page_data['panels'] = _norm_list_panels(panels, img_width, img_height)
+        elif has_size and isinstance(panels, list) and all(isinstance(panel, dict) and panel.keys() >= _PANEL_KEYS
+                                                          for panel in panels):
+            page_data['panels'] = _norm_dict_panels(panels, img_width, img_height)
+        elif 'panels' in page_data and isinstance(page_data['panels'], list):
             converted_panels = []
             for panel in page_data['panels']:
                 if isinstance(panel, list) and len(panel) >= 4:
@@ -332,8 +564,8 @@ def preprocess_page_data(page_data, page_num, image_path=None):
                         
                         # If values are clearly pixel values (greater than 1), warn and skip normalization
                         if raw_x > 1 or raw_y > 1 or raw_w > 1 or raw_h > 1:
-                            print(f"   ⚠️  Warning: Pixel coordinates detected but no image dimensions available")
-                            print(f"       Panel: [{raw_x}, {raw_y}, {raw_w}, {raw_h}]")
+                            log.warning(f"   ⚠️  Warning: Pixel coordinates detected but no image dimensions available")
+                            log.warning(f"       Panel: [{raw_x}, {raw_y}, {raw_w}, {raw_h}]")
                             # Skip this panel as we can't normalize properly
                             continue
                     
@@ -364,27 +596,42 @@ def preprocess_page_data(page_data, page_num, image_path=None):
         return page_data
     
     except Exception as e:
-        print(f"   ⚠️  Error preprocessing page data: {e}")
+        log.warning(f"   ⚠️  Error preprocessing page data: {e}")
         return None
 
 def create_kumiko_directories():
     """Create Pages and panel_result folders in Kumiko directory."""
-    # Get the directory where this script is located (Kumiko folder)
-    kumiko_dir = Path(__file__).parent
-    pages_dir = kumiko_dir / "Pages"
-    panel_result_dir = kumiko_dir / "panel_result"
+    pages_dir = KUMIKO_DIR / "Pages"
+    panel_result_dir = KUMIKO_DIR / "panel_result"
     
     pages_dir.mkdir(exist_ok=True)
     panel_result_dir.mkdir(exist_ok=True)
     
-    print(f"✅ Created/verified Kumiko directories:")
-    print(f"   Pages: {pages_dir.absolute()}")
-    print(f"   panel_result: {panel_result_dir.absolute()}")
+    log.info(f"✅ Created/verified Kumiko directories:")
+    log.info(f"   Pages: {pages_dir.absolute()}")
+    log.info(f"   panel_result: {panel_result_dir.absolute()}")
     
     return pages_dir, panel_result_dir
 
 def detect_file_type(file_path):
-    """Detect actual file type using file command."""
+    """Detect actual file type from its magic bytes, asking the file command only when they are unknown."""
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(264)
+    except OSError:
+        head = b''
+    
+    if head.startswith((b'PK\x03\x04', b'PK\x05\x06')):  # empty archives only have the end record
+        return 'zip'
+    elif head.startswith(b'Rar!\x1a\x07'):
+        return 'rar'
+    elif head.startswith(b'7z\xbc\xaf\x27\x1c'):
+        return '7z'
+    elif head[257:262] == b'ustar':
+        return 'tar'
+    elif head.startswith(b'\x1f\x8b'):
+        return 'gzip'
+    
     try:
         result = subprocess.run(['file', str(file_path)], 
                               capture_output=True, text=True, check=True)
@@ -401,13 +648,36 @@ def detect_file_type(file_path):
         elif 'gzip compressed' in output:
             return 'gzip'
         else:
-            print(f"🔍 File detection: {output}")
+            log.info(f"🔍 File detection: {output}")
             return None
             
     except (subprocess.CalledProcessError, FileNotFoundError):
-        print("⚠️  File type detection not available")
+        log.warning("⚠️  File type detection not available")
         return None
 
+# Members are streamed to disk in chunks this big (zipfile.extract copies 64 KiB at a time)
+ZIP_COPY_CHUNK = 1 << 20
+
+def zip_member_target(info, extract_to):
+    """The path zipfile.extract would write info to: drive, root and "."/".." parts dropped."""
+    name = info.filename.replace('/', os.path.sep)
+    if os.path.altsep:
+        name = name.replace(os.path.altsep, os.path.sep)
+    parts = [part for part in os.path.splitdrive(name)[1].split(os.path.sep) if part not in ('', '.', '..')]
+    return os.path.join(extract_to, *parts)
+
+def extract_zip(archive_path, extract_to):
+    """zip_ref.extractall(extract_to), streaming each member through ZIP_COPY_CHUNK-sized copies."""
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            if info.is_dir() or os.name == 'nt':  # zipfile also sanitises Windows-only characters; leave that to it
+                zip_ref.extract(info, extract_to)
+                continue
+            target = zip_member_target(info, extract_to)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zip_ref.open(info) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK)
+
 def extract_archive(archive_path, extract_to):
     """Extract archive with file type detection."""
     archive_path = Path(archive_path)
@@ -418,7 +688,7 @@ def extract_archive(archive_path, extract_to):
     detected_type = detect_file_type(archive_path)
     suffix = archive_path.suffix.lower()
     
-    print(f"🔍 File: {archive_path.name} (ext: {suffix}, detected: {detected_type})")
+    log.info(f"🔍 File: {archive_path.name} (ext: {suffix}, detected: {detected_type})")
     
     # Use detected type if available, otherwise fall back to extension
     if detected_type:
@@ -430,19 +700,18 @@ def extract_archive(archive_path, extract_to):
     elif suffix in ['.gz', '.gzip']:
         archive_type = 'gzip'
     else:
-        print(f"❌ Unsupported format: {suffix}")
+        log.error(f"❌ Unsupported format: {suffix}")
         return False
     
     if archive_type == 'zip':
         try:
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_to)
-            print(f"✅ Extracted {archive_path.name}")
+            extract_zip(archive_path, extract_to)
+            log.info(f"✅ Extracted {archive_path.name}")
             return True
         except Exception as e:
-            print(f"❌ Failed to extract ZIP: {e}")
+            log.error(f"❌ Failed to extract ZIP: {e}")
             if "not a zip file" in str(e):
-                print(f"⚠️  File is not actually a ZIP archive despite .cbz extension!")
+                log.warning(f"⚠️  File is not actually a ZIP archive despite .cbz extension!")
             return False
     
     elif archive_type == 'gzip':
@@ -450,8 +719,9 @@ def extract_archive(archive_path, extract_to):
         try:
             # Try to extract as tar.gz first
             cmd = ['tar', '-xzf', str(archive_path), '-C', str(extract_to)]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted gzip/tar.gz {archive_path.name}")
+            # Progress output is dropped; only the (short) error stream is kept for the log
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace', check=True)
+            log.info(f"✅ Extracted gzip/tar.gz {archive_path.name}")
             return True
         except subprocess.CalledProcessError:
             # If tar.gz fails, try just gzip decompression
@@ -460,62 +730,62 @@ def extract_archive(archive_path, extract_to):
                 cmd = ['gunzip', '-c', str(archive_path)]
                 with open(output_file, 'wb') as f:
                     subprocess.run(cmd, stdout=f, check=True)
-                print(f"✅ Decompressed gzip {archive_path.name}")
+                log.info(f"✅ Decompressed gzip {archive_path.name}")
                 return True
             except Exception as e:
-                print(f"❌ Failed to extract gzip: {e}")
-                print(f"⚠️  File appears to be gzip but extraction failed")
+                log.error(f"❌ Failed to extract gzip: {e}")
+                log.warning(f"⚠️  File appears to be gzip but extraction failed")
                 return False
     
     elif suffix in ['.rar']:
         # Extract RAR files using unrar
         try:
             cmd = ['unrar', 'x', str(archive_path), str(extract_to)]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted RAR {archive_path.name} to {extract_to}")
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace', check=True)
+            log.info(f"✅ Extracted RAR {archive_path.name} to {extract_to}")
             return True
         except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to extract RAR {archive_path}: {e}")
-            print(f"   Error output: {e.stderr}")
+            log.error(f"❌ Failed to extract RAR {archive_path}: {e}")
+            log.error(f"   Error output: {e.stderr}")
             return False
         except FileNotFoundError:
-            print(f"❌ 'unrar' command not found. Please install unrar:")
-            print(f"   Ubuntu/Debian: sudo apt install unrar")
-            print(f"   Arch: sudo pacman -S unrar")
+            log.error(f"❌ 'unrar' command not found. Please install unrar:")
+            log.error(f"   Ubuntu/Debian: sudo apt install unrar")
+            log.error(f"   Arch: sudo pacman -S unrar")
             return False
     
     elif suffix in ['.7z']:
         # Extract 7Z files using 7z
         try:
             cmd = ['7z', 'x', str(archive_path), f'-o{extract_to}', '-y']
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted 7Z {archive_path.name} to {extract_to}")
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace', check=True)
+            log.info(f"✅ Extracted 7Z {archive_path.name} to {extract_to}")
             return True
         except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to extract 7Z {archive_path}: {e}")
-            print(f"   Error output: {e.stderr}")
+            log.error(f"❌ Failed to extract 7Z {archive_path}: {e}")
+            log.error(f"   Error output: {e.stderr}")
             return False
         except FileNotFoundError:
-            print(f"❌ '7z' command not found. Please install p7zip:")
-            print(f"   Ubuntu/Debian: sudo apt install p7zip-full")
-            print(f"   Arch: sudo pacman -S p7zip")
+            log.error(f"❌ '7z' command not found. Please install p7zip:")
+            log.error(f"   Ubuntu/Debian: sudo apt install p7zip-full")
+            log.error(f"   Arch: sudo pacman -S p7zip")
             return False
     
     elif suffix in ['.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz']:
         # Extract TAR files using tar
         try:
             cmd = ['tar', '-xf', str(archive_path), '-C', str(extract_to)]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted TAR {archive_path.name} to {extract_to}")
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace', check=True)
+            log.info(f"✅ Extracted TAR {archive_path.name} to {extract_to}")
             return True
         except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to extract TAR {archive_path}: {e}")
-            print(f"   Error output: {e.stderr}")
+            log.error(f"❌ Failed to extract TAR {archive_path}: {e}")
+            log.error(f"   Error output: {e.stderr}")
             return False
     
     else:
-        print(f"❌ Unsupported archive format: {suffix}")
-        print(f"   Supported formats: .cbz, .zip, .rar, .7z, .tar, .tar.gz, .tgz, .tar.bz2, .tbz2, .tar.xz, .txz")
+        log.error(f"❌ Unsupported archive format: {suffix}")
+        log.error(f"   Supported formats: .cbz, .zip, .rar, .7z, .tar, .tar.gz, .tgz, .tar.bz2, .tbz2, .tar.xz, .txz")
         return False
 
 def is_archive(file_path):
@@ -534,7 +804,7 @@ def process_image_with_kumiko(image_path, output_dir):
         return True, json_file
     
     # Fallback: try without any flags
-    print(f"   🔄 Trying fallback without flags...")
+    log.info(f"   🔄 Trying fallback without flags...")
     success, file = try_kumiko_with_flags(image_path, output_json, [])
     
     return success, file if success else None
@@ -544,53 +814,137 @@ def try_kumiko_with_flags(image_path, output_file, flags):
     image_name = image_path.stem
     
     # Build Kumiko command with -i for input and -o for output
-    cmd = ['python3', 'kumiko', '-i', str(image_path)] + flags + ['-o', str(output_file)]
+    cmd = [*KUMIKO_CMD, '-i', str(image_path), *flags, '-o', str(output_file)]
     
-    print(f"   Trying: {' '.join(cmd)}")
+    log.info(f"   Trying: {' '.join(cmd)}")
     
     try:
-        # Change to Kumiko directory for execution
-        original_cwd = os.getcwd()
-        kumiko_dir = Path(__file__).parent
-        os.chdir(kumiko_dir)
-        
-        # Run Kumiko
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        # Run Kumiko from its own directory; cwd= rather than os.chdir, which would race between worker threads
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120, cwd=KUMIKO_DIR)
         
         if result.returncode == 0:
             if output_file.exists():
-                print(f"   ✅ Success with flags: {' '.join(flags)}")
+                log.info(f"   ✅ Success with flags: {' '.join(flags)}")
                 return True, output_file
             else:
-                print(f"   ⚠️  File not created: {output_file}")
-                print(f"   Kumiko output: {result.stdout}")
+                log.warning(f"   ⚠️  File not created: {output_file}")
+                log.warning(f"   Kumiko output: {result.stdout}")
                 return False, None
         else:
-            print(f"   ❌ Failed with flags {' '.join(flags)}:")
-            print(f"      Return code: {result.returncode}")
+            log.error(f"   ❌ Failed with flags {' '.join(flags)}:")
+            log.error(f"      Return code: {result.returncode}")
             if result.stderr:
                 error_msg = result.stderr.strip()
                 if len(error_msg) > 200:
                     error_msg = error_msg[:200] + "..."
-                print(f"      Error: {error_msg}")
+                log.error(f"      Error: {error_msg}")
             return False, None
             
     except subprocess.TimeoutExpired:
-        print(f"   ❌ Timeout with flags {' '.join(flags)}")
+        log.error(f"   ❌ Timeout with flags {' '.join(flags)}")
         return False, None
     except Exception as e:
-        print(f"   ❌ Exception with flags {' '.join(flags)}: {e}")
+        log.error(f"   ❌ Exception with flags {' '.join(flags)}: {e}")
         return False, None
+
+def split_into_batches(image_files, workers):
+    """Split images into one batch per worker, capped by image count and command-line length."""
+    target = min(MAX_BATCH_IMAGES, -(-len(image_files) // max(1, workers)))
+    batches, current, chars = [], [], 0
+    for image_file in image_files:
+        length = len(str(image_file.absolute())) + 1
+        if current and (len(current) >= target or chars + length > MAX_BATCH_ARGV_CHARS):
+            batches.append(current)
+            current, chars = [], 0
+        current.append(image_file)
+        chars += length
+    if current:
+        batches.append(current)
+    return batches
+
+def process_image_batch_with_kumiko(image_files, output_dir, index):
+    """Process several images with one Kumiko call (-i takes any number of images), so Python starts once.
+
+    The batch result is split into the same {stem}.json files process_image_with_kumiko writes.
+    Returns {image_file: json_file} for the images Kumiko reported; the caller retries the rest one by one.
+    """
+    # Output entries are matched back by file name, so a name seen twice in the batch is left to the retry
+    name_counts = {}
+    for image_file in image_files:
+        name_counts[image_file.name] = name_counts.get(image_file.name, 0) + 1
+    image_files = [image_file for image_file in image_files if name_counts[image_file.name] == 1]
+    if not image_files:
+        return {}
+    
+    batch_json = output_dir / f"_batch_{index:03d}.json"
+    cmd = [*KUMIKO_CMD, '-i', *(str(image_file.absolute()) for image_file in image_files), '--rtl',
+           '-o', str(batch_json.absolute())]
+    
+    log.info(f"   Processing batch: {image_files[0].name} … {image_files[-1].name} ({len(image_files)} images)")
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120 * len(image_files), cwd=KUMIKO_DIR)
+        if result.returncode != 0 or not batch_json.exists():
+            log.warning(f"   ⚠️  Batch failed (return code {result.returncode}), retrying its images one by one")
+            return {}
+        pages = load_json(batch_json)
+    except subprocess.TimeoutExpired:
+        log.warning(f"   ⚠️  Timeout processing batch starting at {image_files[0].name}, retrying its images one by one")
+        return {}
+    except Exception as e:
+        log.warning(f"   ⚠️  Exception processing batch starting at {image_files[0].name}: {e}")
+        return {}
     finally:
-        os.chdir(original_cwd)
+        batch_json.unlink(missing_ok=True)
+    
+    if not isinstance(pages, list):
+        pages = []
+    by_name = {os.path.basename(page['filename']): page for page in pages if isinstance(page, dict) and 'filename' in page}
+    json_files = {}
+    for image_file in image_files:
+        page = by_name.get(image_file.name)
+        if page is None:
+            continue
+        json_file = output_dir / f"{image_file.stem}.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            f.write(compact_json([page]))
+        json_files[image_file] = json_file
+    return json_files
+
+def process_images_with_kumiko(image_files, output_dir, workers=DEFAULT_WORKERS):
+    """Run Kumiko over all images in a few batches, concurrently. Returns the JSON files created, in image order.
+
+    Images a batch did not cover go through process_image_with_kumiko, several at a time.
+    """
+    batches = split_into_batches(image_files, workers)
+    done = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(batches))) as pool:
+        for batch_results in pool.map(lambda batch, index: process_image_batch_with_kumiko(batch, output_dir, index),
+                                      batches, range(len(batches))):
+            done.update(batch_results)
+    
+    missing = [image_file for image_file in image_files if image_file not in done]
+    if missing:
+        log.info(f"   🔄 Running Kumiko per image for {len(missing)} images")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for image_file, (success, json_file) in zip(missing, pool.map(
+                    lambda image_file: process_image_with_kumiko(image_file, output_dir), missing)):
+                if success:
+                    done[image_file] = json_file
+    
+    json_files = []
+    for image_file in image_files:
+        json_file = done.get(image_file)
+        if json_file and json_file.exists():
+            json_files.append(json_file)
+        else:
+            log.warning(f"   ⚠️  Failed to process {image_file.name}")
+    return json_files
 
 def convert_json_to_html(json_file, html_file):
     """Convert Kumiko JSON output to HTML format for processing."""
-    import json
-    
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(json_file)
         
         # Create a simple HTML structure with the panel data
         html_content = f"""<!DOCTYPE html>
@@ -601,7 +955,7 @@ def convert_json_to_html(json_file, html_file):
 <body>
     <h1>Panel Data for {json_file.stem}</h1>
     <script>
-        var panelData = {json.dumps(data, indent=2)};
+        var panelData = {compact_json(data)};
     </script>
 </body>
 </html>"""
@@ -609,143 +963,317 @@ def convert_json_to_html(json_file, html_file):
         with open(html_file, 'w', encoding='utf-8') as f:
             f.write(html_content)
         
-        print(f"   ✅ Converted JSON to HTML: {html_file}")
+        log.info(f"   ✅ Converted JSON to HTML: {html_file}")
         return True, html_file
         
     except Exception as e:
-        print(f"   ❌ JSON to HTML conversion failed: {e}")
+        log.error(f"   ❌ JSON to HTML conversion failed: {e}")
         return False, None
 
+# Tried in order on each Kumiko HTML page; compiled once instead of on every page
+_PANEL_RE = tuple(re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+    # JSON format in script tags - look for the actual panels array (full array)
+    r'"panels":\s*(\[[^\]]*(?:\][^\]]*)*\])',
+    r'"panels":\s*(\[\s*\[[^\]]*\]\s*(?:,\s*\[[^\]]*\]\s*)*\])',
+    # Script tag JSON
+    r'<script[^>]*>.*?var\s+\w+\s*=\s*(\{.*?\});.*?</script>',
+    r'<script[^>]*>.*?const\s+\w+\s*=\s*(\{.*?\});.*?</script>',
+    r'<script[^>]*>.*?let\s+\w+\s*=\s*(\{.*?\});.*?</script>',
+    # Direct JSON in HTML
+    r'(\{[^}]*"panels"[^}]*\})',
+    r'(\{[^}]*"x"[^}]*"y"[^}]*"w"[^}]*"h"[^}]*\})',
+    # Panel coordinates in various formats
+    r'panel.*?{.*?x.*?(\d+\.?\d*).*?y.*?(\d+\.?\d*).*?w.*?(\d+\.?\d*).*?h.*?(\d+\.?\d*)}',
+    r'x.*?(\d+\.?\d*).*?y.*?(\d+\.?\d*).*?width.*?(\d+\.?\d*).*?height.*?(\d+\.?\d*)',
+    r'"x":\s*(\d+\.?\d*),\s*"y":\s*(\d+\.?\d*),\s*"w":\s*(\d+\.?\d*),\s*"h":\s*(\d+\.?\d*)',
+    r'x:\s*(\d+\.?\d*),\s*y:\s*(\d+\.?\d*),\s*w:\s*(\d+\.?\d*),\s*h:\s*(\d+\.?\d*)',
+    # Array format - capture nested arrays (multiple)
+    r'\[\s*\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]\s*(?:,\s*\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]\s*)*',
+    r'\[\s*\{\s*"x"\s*:\s*(\d+\.?\d*)\s*,\s*"y"\s*:\s*(\d+\.?\d*)\s*,\s*"w"\s*:\s*(\d+\.?\d*)\s*,\s*"h"\s*:\s*(\d+\.?\d*)\s*\}\s*\]'
+))
+
+# Last resort when no panel pattern matched: report anything JSON-like for debugging
+_JSON_LIKE_RE = tuple(re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+    r'(\{[^{}]*\})',
+    r'(\[[^\[\]]*\])'
+))
+
+_PANEL_ARRAY_RE = re.compile(r'\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]')
+_NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+
+# How convert_json_to_html embeds the Kumiko JSON in its HTML pages
+_PANEL_DATA_MARKER = 'var panelData = '
+_JSON_DECODER = json.JSONDecoder()
+
+def embedded_panel_lists(html_content):
+    """Panel lists of the panelData written by convert_json_to_html, or None for HTML from elsewhere."""
+    start = html_content.find(_PANEL_DATA_MARKER)
+    if start < 0:
+        return None
+    try:
+        # Parses exactly one JSON value and stops at its end, so the trailing "; </script>" is fine
+        data, _ = _JSON_DECODER.raw_decode(html_content, start + len(_PANEL_DATA_MARKER))
+    except json.JSONDecodeError:
+        return None
+    if isinstance(data, dict):
+        pages = data.get('pages', [data])
+    else:
+        pages = data if isinstance(data, list) else []
+    return [page['panels'] for page in pages if isinstance(page, dict) and isinstance(page.get('panels'), list)]
+
+# convert_json_to_html puts panelData at the end of the page; large files are tried from their tail first
+HTML_TAIL_BYTES = 512 << 10
+
+def read_html_panels(html_file):
+    """(html_content, embedded_panel_lists(html_content)) for one HTML page.
+
+    For files over HTML_TAIL_BYTES only the tail is read when it holds the whole panelData;
+    otherwise (other HTML, or a payload longer than the tail) the full file is read.
+    """
+    size = os.path.getsize(html_file)
+    if size > HTML_TAIL_BYTES:
+        with open(html_file, 'rb') as f:
+            f.seek(size - HTML_TAIL_BYTES)
+            tail = f.read().decode('utf-8', 'ignore')
+        panel_lists = embedded_panel_lists(tail)
+        if panel_lists:
+            return tail, panel_lists
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    return html_content, embedded_panel_lists(html_content)
+
+def _name_index(paths):
+    """Sorted (name, walk position, path) triples for _images_for_stem."""
+    return sorted((path.name, i, path) for i, path in enumerate(paths))
+
+# Name parts of scaled-down copies that can sit next to the real page image
+THUMBNAIL_MARKERS = ('thumb', 'small')
+
+def _images_for_stem(name_index, stem):
+    """Paths whose name starts with stem (like rglob(f"{stem}*") over files), best match first.
+
+    An exact <stem>.<ext> beats a longer name (p1.png before p10.png), full pages beat thumbnails,
+    then walk order. Names sharing a prefix are adjacent once sorted, so this is a bisect plus the matches.
+    """
+    hits = []
+    for name, i, path in islice(name_index, bisect_left(name_index, (stem,)), None):
+        if not name.startswith(stem):
+            break
+        rest = name[len(stem):].lower()
+        hits.append((path.stem != stem, any(marker in rest for marker in THUMBNAIL_MARKERS), i, path))
+    return [hit[-1] for hit in sorted(hits)]
+
+def _image_size(image_path, sizes):
+    """img.size of image_path, from the PNG/JPEG header when possible, reading each image at most once per sizes cache."""
+    size = sizes.get(image_path)
+    if size is None:
+        size = read_header_size(image_path)
+        if size is None:
+            if Image is None:
+                raise ImportError("No module named 'PIL'")
+            with Image.open(image_path) as img:
+                size = img.size
+        sizes[image_path] = size
+    return size
+
+def _page_image_name(stem, temp_html_dir, folder_path, listed, tree_files, names):
+    """Image name recorded for the HTML page stem, cached in names.
+
+    A flat <stem>.jpg/.jpeg/.png (either case) in temp_html_dir or folder_path wins; otherwise the best
+    <stem>* image below folder_path, as a relative path. Defaults to <stem>.jpg.
+    """
+    name = names.get(stem)
+    if name is not None:
+        return name
+    name = stem + ".jpg"  # default
+    
+    # First try flat directory structure
+    for ext, upper in HTML_IMAGE_SUFFIXES:
+        for folder in [temp_html_dir, folder_path]:
+            if (stem + ext) in listed[folder]:
+                name = stem + ext
+                break
+            if (stem + upper) in listed[folder]:
+                name = stem + upper
+                break
+        else:
+            continue
+        break
+    
+    # If not found, try subdirectory structure (tree_files only holds .jpg/.jpeg/.png files)
+    if name == stem + ".jpg":
+        for img_file in _images_for_stem(tree_files, stem):
+            name = str(img_file.relative_to(folder_path))
+            break
+    
+    names[stem] = name
+    return name
+
+def _panel_list_coords(match, raw_coords):
+    """Panel list from the embedded panelData."""
+    for panel_coords in match:
+        if isinstance(panel_coords, list) and len(panel_coords) >= 4:
+            raw_coords.append(tuple(map(float, panel_coords[:4])))
+    log.debug("     Processed %s panels from panelData", len(match))
+
+def _panel_text_coords(match, raw_coords):
+    """Text captured by a single-group pattern: a panels array or a JSON object."""
+    # Check if it's a panels array like [[430, 56, 160, 291], [231, 56, 192, 2...]
+    if match.strip().startswith('[') and not match.strip().startswith('{'):
+        # Parse as panels array
+        try:
+            panels_array = json.loads(match)
+            if isinstance(panels_array, list):
+                for panel_coords in panels_array:
+                    if isinstance(panel_coords, list) and len(panel_coords) >= 4:
+                        x, y, w, h = map(float, panel_coords[:4])
+                        raw_coords.append((x, y, w, h))
+            log.debug("     Processed %s panels from array", len(panels_array))
+        except json.JSONDecodeError:
+            # Try regex extraction for nested arrays
+            coord_matches = _PANEL_ARRAY_RE.findall(match)
+            for x, y, w, h in coord_matches:
+                raw_coords.append((float(x), float(y), float(w), float(h)))
+            log.debug("     Processed %s panels via regex", len(coord_matches))
+    else:
+        # Try to parse as JSON first
+        try:
+            data = json.loads(match)
+            if 'panels' in data:
+                panel_list = data['panels']
+                if isinstance(panel_list, list):
+                    for panel_data in panel_list:
+                        if isinstance(panel_data, list) and len(panel_data) >= 4:
+                            x, y, w, h = map(float, panel_data[:4])
+                            raw_coords.append((x, y, w, h))
+                        elif isinstance(panel_data, dict) and all(key in panel_data for key in ['x', 'y', 'w', 'h']):
+                            x, y, w, h = map(float, [panel_data['x'], panel_data['y'], panel_data['w'], panel_data['h']])
+                            raw_coords.append((x, y, w, h))
+                log.debug("     Processed %s panels from JSON", len(panel_list))
+            elif 'x' in data and 'y' in data:
+                if all(key in data for key in ['x', 'y', 'w', 'h']):
+                    x, y, w, h = map(float, [data['x'], data['y'], data['w'], data['h']])
+                    raw_coords.append((x, y, w, h))
+        except json.JSONDecodeError:
+            # Try regex extraction
+            coord_matches = _NUMBER_RE.findall(match)
+            # Process in groups of 4
+            for i in range(0, len(coord_matches) - 3, 4):
+                x, y, w, h = map(float, coord_matches[i:i+4])
+                raw_coords.append((x, y, w, h))
+
+def _panel_group_coords(match, raw_coords):
+    """Tuple format from a multi-group pattern: x, y, w, h first."""
+    x, y, w, h = map(float, match[:4])
+    raw_coords.append((x, y, w, h))
+
+def _match_parser(match):
+    """The _panel_*_coords parser for matches shaped like this one."""
+    if isinstance(match, list):
+        return _panel_list_coords
+    if isinstance(match, str):
+        return _panel_text_coords
+    return _panel_group_coords
+
 def combine_htmls_to_json(html_files, output_json, temp_html_dir, folder_path):
     """Combine multiple HTML files into a single JSON with page-based structure."""
-    import json
-    import re
     
     pages_data = []
     reading_direction = "rtl"  # Default to RTL for manga
     
-    print(f"🔄 Combining {len(html_files)} HTML files to JSON...")
+    log.info(f"🔄 Combining {len(html_files)} HTML files to JSON...")
     
     # First, check which HTML files actually exist
     existing_html_files = []
     for html_file in html_files:
         if html_file.exists():
             existing_html_files.append(html_file)
-            print(f"   Found: {html_file.name}")
+            log.info(f"   Found: {html_file.name}")
         else:
-            print(f"   ❌ Missing: {html_file}")
+            log.error(f"   ❌ Missing: {html_file}")
     
     if not existing_html_files:
-        print(f"❌ No HTML files found to process")
+        log.error(f"❌ No HTML files found to process")
         return False
     
-    # Debug: Show content of first HTML file
-    if existing_html_files:
+    # One listing per folder instead of an exists() per candidate image name
+    listed = {temp_html_dir: _dir_names(temp_html_dir), folder_path: _dir_names(folder_path)}
+    # And one walk of folder_path for the subdirectory fallbacks, instead of an rglob per HTML file
+    tree_files = _name_index(path for path in folder_path.rglob('*')
+                             if path.suffix.lower() in HTML_IMAGE_EXTENSIONS and path.is_file())
+    # Image sizes by path: an image found through several candidates is still opened once
+    image_sizes = {}
+    # The page images' headers are read one per page below; queue all their reads up front
+    prefetch_headers(path for name, i, path in tree_files)
+    # Page image names by HTML stem, shared by the normal and the error paths
+    image_names = {}
+    
+    # Debug: Show content of first HTML file (only read when --verbose will print it)
+    if existing_html_files and log.isEnabledFor(logging.DEBUG):
         first_html = existing_html_files[0]
-        print(f"🔍 Debug: First HTML file content preview:")
+        log.debug(f"🔍 Debug: First HTML file content preview:")
         try:
             with open(first_html, 'r', encoding='utf-8') as f:
                 content = f.read()
-                print(f"   Size: {len(content)} characters")
-                print(f"   First 500 chars: {content[:500]}")
-                print(f"   Contains 'panel': {'panel' in content.lower()}")
-                print(f"   Contains 'json': {'json' in content.lower()}")
-                print(f"   Contains 'coordinates': {'coordinates' in content.lower()}")
+                log.debug(f"   Size: {len(content)} characters")
+                log.debug(f"   First 500 chars: {content[:500]}")
+                log.debug(f"   Contains 'panel': {'panel' in content.lower()}")
+                log.debug(f"   Contains 'json': {'json' in content.lower()}")
+                log.debug(f"   Contains 'coordinates': {'coordinates' in content.lower()}")
         except Exception as e:
-            print(f"   Error reading file: {e}")
+            log.debug(f"   Error reading file: {e}")
     
     # Sort HTML files by name to ensure correct page order
     existing_html_files.sort(key=lambda x: x.name)
     
     for page_num, html_file in enumerate(existing_html_files, 1):
-        print(f"   Processing page {page_num}: {html_file.name}")
+        log.info(f"   Processing page {page_num}: {html_file.name}")
         
         try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                html_content = f.read()
+            html_content, panel_lists = read_html_panels(html_file)
             
             # Debug: Show what we're looking for
-            print(f"     File size: {len(html_content)} chars")
+            log.debug(f"     File size: {len(html_content)} chars")
             
             # Try to extract panel data from HTML using multiple patterns
-            panel_patterns = [
-                # JSON format in script tags - look for the actual panels array (full array)
-                r'"panels":\s*(\[[^\]]*(?:\][^\]]*)*\])',
-                r'"panels":\s*(\[\s*\[[^\]]*\]\s*(?:,\s*\[[^\]]*\]\s*)*\])',
-                # Script tag JSON
-                r'<script[^>]*>.*?var\s+\w+\s*=\s*(\{.*?\});.*?</script>',
-                r'<script[^>]*>.*?const\s+\w+\s*=\s*(\{.*?\});.*?</script>',
-                r'<script[^>]*>.*?let\s+\w+\s*=\s*(\{.*?\});.*?</script>',
-                # Direct JSON in HTML
-                r'(\{[^}]*"panels"[^}]*\})',
-                r'(\{[^}]*"x"[^}]*"y"[^}]*"w"[^}]*"h"[^}]*\})',
-                # Panel coordinates in various formats
-                r'panel.*?{.*?x.*?(\d+\.?\d*).*?y.*?(\d+\.?\d*).*?w.*?(\d+\.?\d*).*?h.*?(\d+\.?\d*)}',
-                r'x.*?(\d+\.?\d*).*?y.*?(\d+\.?\d*).*?width.*?(\d+\.?\d*).*?height.*?(\d+\.?\d*)',
-                r'"x":\s*(\d+\.?\d*),\s*"y":\s*(\d+\.?\d*),\s*"w":\s*(\d+\.?\d*),\s*"h":\s*(\d+\.?\d*)',
-                r'x:\s*(\d+\.?\d*),\s*y:\s*(\d+\.?\d*),\s*w:\s*(\d+\.?\d*),\s*h:\s*(\d+\.?\d*)',
-                # Array format - capture nested arrays (multiple)
-                r'\[\s*\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]\s*(?:,\s*\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]\s*)*',
-                r'\[\s*\{\s*"x"\s*:\s*(\d+\.?\d*)\s*,\s*"y"\s*:\s*(\d+\.?\d*)\s*,\s*"w"\s*:\s*(\d+\.?\d*)\s*,\s*"h"\s*:\s*(\d+\.?\d*)\s*\}\s*\]'
-            ]
             
             matches = []
             used_pattern = None
             
-            for i, pattern in enumerate(panel_patterns):
-                pattern_matches = re.findall(pattern, html_content, re.IGNORECASE | re.DOTALL)
-                if pattern_matches:
-                    matches = pattern_matches
-                    used_pattern = f"Pattern {i+1}: {pattern[:50]}..."
-                    print(f"     Found {len(matches)} matches with {used_pattern}")
-                    
-                    # Debug: Show first match
+            # Our own HTML: read the embedded JSON directly, the patterns are for everything else
+            if panel_lists:
+                matches = panel_lists
+                log.debug("     Found %s panel lists in embedded panelData", len(matches))
+            else:
+                for i, rx in enumerate(_PANEL_RE):
+                    pattern_matches = rx.findall(html_content)
                     if pattern_matches:
-                        first_match = str(pattern_matches[0])
-                        if len(first_match) > 200:
-                            first_match = first_match[:200] + "..."
-                        print(f"     First match: {first_match}")
-                    break
+                        matches = pattern_matches
+                        used_pattern = f"Pattern {i+1}: {rx.pattern[:50]}..."
+                        log.debug(f"     Found {len(matches)} matches with {used_pattern}")
+                        
+                        # Debug: Show first match
+                        if pattern_matches:
+                            first_match = str(pattern_matches[0])
+                            if len(first_match) > 200:
+                                first_match = first_match[:200] + "..."
+                            log.debug(f"     First match: {first_match}")
+                        break
             
             if not matches:
-                print(f"     ❌ No panel matches found")
+                log.error(f"     ❌ No panel matches found")
                 # Try to find any JSON data
-                json_patterns = [
-                    r'(\{[^{}]*\})',
-                    r'(\[[^\[\]]*\])'
-                ]
-                for pattern in json_patterns:
-                    json_matches = re.findall(pattern, html_content, re.IGNORECASE | re.DOTALL)
+                for rx in _JSON_LIKE_RE:
+                    json_matches = rx.findall(html_content)
                     if json_matches:
-                        print(f"     Found {len(json_matches)} JSON-like structures")
+                        log.debug(f"     Found {len(json_matches)} JSON-like structures")
                         for i, match in enumerate(json_matches[:3]):  # Show first 3
                             match_str = str(match)
                             if len(match_str) > 100:
                                 match_str = match_str[:100] + "..."
-                            print(f"       JSON {i+1}: {match_str}")
+                            log.debug(f"       JSON {i+1}: {match_str}")
                 # Create empty page data and continue
-                # Try to find the actual image file to determine the correct extension
-                actual_image_name = html_file.stem + ".jpg"  # default
-                
-                # First try flat directory structure
-                for ext in ['.jpg', '.jpeg', '.png']:
-                    for folder in [temp_html_dir, folder_path]:
-                        if (folder / (html_file.stem + ext)).exists():
-                            actual_image_name = html_file.stem + ext
-                            break
-                        if (folder / (html_file.stem + ext.upper())).exists():
-                            actual_image_name = html_file.stem + ext.upper()
-                            break
-                    else:
-                        continue
-                    break
-                
-                # If not found, try subdirectory structure
-                if actual_image_name == html_file.stem + ".jpg":
-                    for img_file in folder_path.rglob(f"{html_file.stem}*"):
-                        if img_file.is_file() and img_file.suffix.lower() in ['.jpg', '.jpeg', '.png']:
-                            actual_image_name = str(img_file.relative_to(folder_path))
-                            break
+                actual_image_name = _page_image_name(html_file.stem, temp_html_dir, folder_path, listed, tree_files, image_names)
                 
                 page_data = {
                     "page": page_num,
@@ -761,12 +1289,10 @@ def combine_htmls_to_json(html_files, output_json, temp_html_dir, folder_path):
             
             # Look for the image in the temp directory or original folder with better format support
             # When images are in subdirectories, we need to find the corresponding image file
-            image_extensions = ['.jpg', '.jpeg', '.png']
-            
             # First try to find image based on HTML file stem (for flat directory structure)
-            for ext in image_extensions:
+            for ext, upper in HTML_IMAGE_SUFFIXES:
                 image_name = html_file.stem + ext
-                image_name_upper = html_file.stem + ext.upper()
+                image_name_upper = html_file.stem + upper
                 
                 possible_image_paths = [
                     temp_html_dir / image_name,      # in temp dir
@@ -776,122 +1302,48 @@ def combine_htmls_to_json(html_files, output_json, temp_html_dir, folder_path):
                 ]
                 
                 for img_path in possible_image_paths:
-                    if img_path.exists():
+                    if img_path.name in listed[img_path.parent]:
                         try:
-                            from PIL import Image
-                            with Image.open(img_path) as img:
-                                actual_img_width, actual_img_height = img.size
-                                print(f"     Found actual image dimensions: {actual_img_width}x{actual_img_height} from {img_path.name}")
-                                break
+                            actual_img_width, actual_img_height = _image_size(img_path, image_sizes)
+                            log.debug("     Found actual image dimensions: %sx%s from %s", actual_img_width, actual_img_height, img_path.name)
+                            break
                         except Exception as e:
-                            print(f"     Could not read image {img_path}: {e}")
+                            log.warning(f"     Could not read image {img_path}: {e}")
                 else:
                     continue
                 break
             
             # If not found, try to find any image file that matches the HTML stem (for subdirectory structure)
             if actual_img_width == 800 and actual_img_height == 1200:  # still using fallback
-                print(f"     Trying to find image for {html_file.stem} in subdirectories...")
-                for img_file in folder_path.rglob(f"{html_file.stem}*"):
-                    if img_file.is_file() and img_file.suffix.lower() in image_extensions:
+                log.debug("     Trying to find image for %s in subdirectories...", html_file.stem)
+                for img_file in _images_for_stem(tree_files, html_file.stem):
+                    if img_file.suffix.lower() in HTML_IMAGE_EXTENSIONS:
                         try:
-                            from PIL import Image
-                            with Image.open(img_file) as img:
-                                actual_img_width, actual_img_height = img.size
-                                print(f"     Found actual image dimensions: {actual_img_width}x{actual_img_height} from {img_file.relative_to(folder_path)}")
-                                break
+                            actual_img_width, actual_img_height = _image_size(img_file, image_sizes)
+                            log.debug("     Found actual image dimensions: %sx%s from %s", actual_img_width, actual_img_height, img_file.relative_to(folder_path))
+                            break
                         except Exception as e:
-                            print(f"     Could not read image {img_file}: {e}")
+                            log.warning(f"     Could not read image {img_file}: {e}")
             
             img_w, img_h = actual_img_width, actual_img_height
             
-            page_panels = []
-            panels_added = 0
+            # Pixel coordinates of every panel on the page, normalized together after the matches are parsed
+            raw_coords = []
             
+            # Every match on a page has the same shape (one regex's findall, or the panelData lists): pick its parser once
+            parse_match = _match_parser(matches[0])
             for match in matches:
                 try:
-                    # Handle different match formats
-                    if isinstance(match, str):
-                        # Check if it's a panels array like [[430, 56, 160, 291], [231, 56, 192, 2...]
-                        if match.strip().startswith('[') and not match.strip().startswith('{'):
-                            # Parse as panels array
-                            try:
-                                panels_array = json.loads(match)
-                                if isinstance(panels_array, list):
-                                    for panel_coords in panels_array:
-                                        if isinstance(panel_coords, list) and len(panel_coords) >= 4:
-                                            x, y, w, h = map(float, panel_coords[:4])
-                                            panels_added += add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h)
-                                print(f"     Processed {len(panels_array)} panels from array")
-                            except json.JSONDecodeError:
-                                # Try regex extraction for nested arrays
-                                array_pattern = r'\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]'
-                                coord_matches = re.findall(array_pattern, match)
-                                for x, y, w, h in coord_matches:
-                                    panels_added += add_normalized_panel_to_page(page_panels, float(x), float(y), float(w), float(h), img_w, img_h)
-                                print(f"     Processed {len(coord_matches)} panels via regex")
-                        else:
-                            # Try to parse as JSON first
-                            try:
-                                data = json.loads(match)
-                                if 'panels' in data:
-                                    panel_list = data['panels']
-                                    if isinstance(panel_list, list):
-                                        for panel_data in panel_list:
-                                            if isinstance(panel_data, list) and len(panel_data) >= 4:
-                                                x, y, w, h = map(float, panel_data[:4])
-                                                panels_added += add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h)
-                                            elif isinstance(panel_data, dict) and all(key in panel_data for key in ['x', 'y', 'w', 'h']):
-                                                x, y, w, h = map(float, [panel_data['x'], panel_data['y'], panel_data['w'], panel_data['h']])
-                                                panels_added += add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h)
-                                    print(f"     Processed {len(panel_list)} panels from JSON")
-                                elif 'x' in data and 'y' in data:
-                                    panel_list = [data]
-                                    for panel_data in panel_list:
-                                        if all(key in panel_data for key in ['x', 'y', 'w', 'h']):
-                                            x, y, w, h = map(float, [panel_data['x'], panel_data['y'], panel_data['w'], panel_data['h']])
-                                            panels_added += add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h)
-                            except json.JSONDecodeError:
-                                # Try regex extraction
-                                coord_matches = re.findall(r'(\d+\.?\d*)', match)
-                                if len(coord_matches) >= 4:
-                                    # Process in groups of 4
-                                    for i in range(0, len(coord_matches), 4):
-                                        if i + 3 < len(coord_matches):
-                                            x, y, w, h = map(float, coord_matches[i:i+4])
-                                            panels_added += add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h)
-                    else:
-                        # Tuple format from regex
-                        x, y, w, h = map(float, match[:4])
-                        panels_added += add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h)
-                        
+                    parse_match(match, raw_coords)
                 except Exception as e:
-                    print(f"     Error processing match: {e}")
+                    log.warning(f"     Error processing match: {e}")
                     continue
             
-            # Create page data structure
-            # Try to find the actual image file to determine the correct extension
-            actual_image_name = html_file.stem + ".jpg"  # default
+            page_panels = normalized_page_panels(raw_coords, img_w, img_h)
+            panels_added = len(page_panels)
             
-            # First try flat directory structure
-            for ext in ['.jpg', '.jpeg', '.png']:
-                for folder in [temp_html_dir, folder_path]:
-                    if (folder / (html_file.stem + ext)).exists():
-                        actual_image_name = html_file.stem + ext
-                        break
-                    if (folder / (html_file.stem + ext.upper())).exists():
-                        actual_image_name = html_file.stem + ext.upper()
-                        break
-                else:
-                    continue
-                break
-            
-            # If not found, try subdirectory structure
-            if actual_image_name == html_file.stem + ".jpg":
-                for img_file in folder_path.rglob(f"{html_file.stem}*"):
-                    if img_file.is_file() and img_file.suffix.lower() in ['.jpg', '.jpeg', '.png']:
-                        actual_image_name = str(img_file.relative_to(folder_path))
-                        break
+            # Create page data structure
+            actual_image_name = _page_image_name(html_file.stem, temp_html_dir, folder_path, listed, tree_files, image_names)
             
             page_data = {
                 "page": page_num,
@@ -900,33 +1352,12 @@ def combine_htmls_to_json(html_files, output_json, temp_html_dir, folder_path):
             }
             pages_data.append(page_data)
             
-            print(f"     Added {panels_added} panels for page {page_num}")
+            log.info(f"     Added {panels_added} panels for page {page_num}")
         
         except Exception as e:
-            print(f"   ❌ Error processing {html_file}: {e}")
+            log.error(f"   ❌ Error processing {html_file}: {e}")
             # Create empty page data even on error
-            # Try to find the actual image file to determine the correct extension
-            actual_image_name = html_file.stem + ".jpg"  # default
-            
-            # First try flat directory structure
-            for ext in ['.jpg', '.jpeg', '.png']:
-                for folder in [temp_html_dir, folder_path]:
-                    if (folder / (html_file.stem + ext)).exists():
-                        actual_image_name = html_file.stem + ext
-                        break
-                    if (folder / (html_file.stem + ext.upper())).exists():
-                        actual_image_name = html_file.stem + ext.upper()
-                        break
-                else:
-                    continue
-                break
-            
-            # If not found, try subdirectory structure
-            if actual_image_name == html_file.stem + ".jpg":
-                for img_file in folder_path.rglob(f"{html_file.stem}*"):
-                    if img_file.is_file() and img_file.suffix.lower() in ['.jpg', '.jpeg', '.png']:
-                        actual_image_name = str(img_file.relative_to(folder_path))
-                        break
+            actual_image_name = _page_image_name(html_file.stem, temp_html_dir, folder_path, listed, tree_files, image_names)
             
             page_data = {
                 "page": page_num,
@@ -937,205 +1368,165 @@ def combine_htmls_to_json(html_files, output_json, temp_html_dir, folder_path):
             continue
     
     if not pages_data:
-        print(f"❌ No page data created")
+        log.error(f"❌ No page data created")
         return False
     
     # Count total panels
     total_panels = sum(len(page_data["panels"]) for page_data in pages_data)
-    print(f"📊 Total pages: {len(pages_data)}, Total panels: {total_panels}")
-    
-    # Create final JSON structure with pages array
-    json_data = {
-        "reading_direction": reading_direction,
-        "total_pages": len(pages_data),
-        "pages": pages_data
-    }
+    log.info(f"📊 Total pages: {len(pages_data)}, Total panels: {total_panels}")
     
-    # Write JSON output
+    # Write JSON output page by page (same {"reading_direction", "total_pages", "pages"} document)
     try:
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2, ensure_ascii=False)
+        dump_pages_json(reading_direction, pages_data, output_json)
         
-        print(f"✅ Combined {total_panels} panels from {len(pages_data)} pages to {output_json}")
+        log.info(f"✅ Combined {total_panels} panels from {len(pages_data)} pages to {output_json}")
         return True
         
     except Exception as e:
-        print(f"❌ Error writing JSON: {e}")
+        log.error(f"❌ Error writing JSON: {e}")
         return False
 
+if njit is not None:
+    # error_model='numpy': a zero image size gives inf/NaN like the NumPy path instead of ZeroDivisionError
+    @njit(cache=True, error_model='numpy')
+    def _unit_coords(coords, img_w, img_h):
+        """(N, 4) pixel coords divided by the image size in place, NaN to 1 and clamped to 0-1, in one pass."""
+        sizes = (img_w, img_h, img_w, img_h)
+        for i in range(coords.shape[0]):
+            for j in range(4):
+                v = coords[i, j] / sizes[j]
+                coords[i, j] = 1.0 if v != v else min(max(v, 0.0), 1.0)
+        return coords
+else:
+    def _unit_coords(coords, img_w, img_h):
+        """(N, 4) pixel coords divided by the image size in place, NaN to 1 and clamped to 0-1."""
+        coords /= (img_w, img_h, img_w, img_h)
+        # NaN clamps to 1, as max(0, min(1, v)) did
+        return np.clip(np.nan_to_num(coords, copy=False, nan=1.0), 0.0, 1.0, out=coords)
+
+def normalized_page_panels(raw_coords, img_w, img_h):
+    """Panel dicts for a page's pixel (x, y, w, h) tuples: divided by the image size, clamped to 0-1, rounded to 3 places."""
+    if not raw_coords:
+        return []
+    coords = _unit_coords(np.array(raw_coords, dtype=np.float64).reshape(-1, 4), float(img_w), float(img_h))
+    panels = [{"x": round(x, 3), "y": round(y, 3), "w": round(w, 3), "h": round(h, 3)} for x, y, w, h in coords.tolist()]
+    if log.isEnabledFor(logging.DEBUG):
+        for panel in panels:
+            log.debug("       Added panel: x=%s, y=%s, w=%s, h=%s", panel['x'], panel['y'], panel['w'], panel['h'])
+    return panels
+
 def add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h):
     """Add a normalized panel to a specific page's panel list."""
-    # Normalize to 0-1 range
-    normalized_x = x / img_w
-    normalized_y = y / img_h
-    normalized_w = w / img_w
-    normalized_h = h / img_h
-    
-    # Clamp to valid range
-    normalized_x = max(0, min(1, normalized_x))
-    normalized_y = max(0, min(1, normalized_y))
-    normalized_w = max(0, min(1, normalized_w))
-    normalized_h = max(0, min(1, normalized_h))
-    
-    panel = {
-        "x": round(normalized_x, 3),
-        "y": round(normalized_y, 3),
-        "w": round(normalized_w, 3),
-        "h": round(normalized_h, 3)
-    }
-    
-    page_panels.append(panel)
-    print(f"       Added panel: x={panel['x']}, y={panel['y']}, w={panel['w']}, h={panel['h']}")
+    page_panels.extend(normalized_page_panels([(x, y, w, h)], img_w, img_h))
     return 1
 
 def add_normalized_panel(all_panels, x, y, w, h, img_w, img_h):
     """Add a normalized panel to the list."""
-    # Normalize to 0-1 range
-    normalized_x = x / img_w
-    normalized_y = y / img_h
-    normalized_w = w / img_w
-    normalized_h = h / img_h
-    
-    # Clamp to valid range
-    normalized_x = max(0, min(1, normalized_x))
-    normalized_y = max(0, min(1, normalized_y))
-    normalized_w = max(0, min(1, normalized_w))
-    normalized_h = max(0, min(1, normalized_h))
-    
-    panel = {
-        "x": round(normalized_x, 3),
-        "y": round(normalized_y, 3),
-        "w": round(normalized_w, 3),
-        "h": round(normalized_h, 3)
-    }
-    
-    all_panels.append(panel)
-    print(f"       Added panel: x={panel['x']}, y={panel['y']}, w={panel['w']}, h={panel['h']}")
+    all_panels.extend(normalized_page_panels([(x, y, w, h)], img_w, img_h))
     return 1
 
-def process_chapter_based_archive(folder_path, output_dir):
+def process_chapter(chapter_dir, chapter_json, workers=DEFAULT_WORKERS):
+    """Run Kumiko over one chapter folder and write chapter_json ({folder_name}_{chapter}.json).
+
+    Returns (success, total_pages).
+    """
+    log.info(f"\n📖 Processing chapter: {chapter_dir.name}")
+    
+    # Chapter-specific temp folder next to the chapter output
+    temp_json_dir = chapter_json.with_name(f"{chapter_json.stem}_temp")
+    temp_json_dir.mkdir(exist_ok=True)
+    
+    # Get all image files in this chapter, sorted for consistent processing
+    image_files = list_images(chapter_dir)
+    
+    if not image_files:
+        log.warning(f"   ⚠️  No image files found in {chapter_dir.name}")
+        return False, 0
+    
+    log.info(f"   Found {len(image_files)} image files in {chapter_dir.name}")
+    
+    # Process the images in this chapter, several at a time
+    json_files = process_images_with_kumiko(image_files, temp_json_dir, workers)
+    successful_images = len(json_files)
+    
+    log.info(f"   Successfully processed {successful_images}/{len(image_files)} images in {chapter_dir.name}")
+    
+    if not json_files:
+        log.error(f"   ❌ No JSON files were generated for {chapter_dir.name}")
+        return False, 0
+    
+    # Combine all JSON files into single JSON for this chapter
+    success, total_pages = combine_jsons_to_json(json_files, chapter_json, chapter_name=chapter_dir.name)
+    
+    if success:
+        log.info(f"   ✅ Chapter {chapter_dir.name} completed successfully")
+    
+    # Clean up temporary JSON files
+    try:
+        shutil.rmtree(temp_json_dir)
+        log.info(f"   🧹 Cleaned up temporary files for {chapter_dir.name}")
+    except Exception as e:
+        log.warning(f"   ⚠️  Could not clean up temp files for {chapter_dir.name}: {e}")
+    
+    return success, total_pages
+
+def process_chapter_based_archive(folder_path, output_dir, workers=DEFAULT_WORKERS):
     """Process a CBZ archive with chapter folders for KOReader compatibility."""
     folder_name = folder_path.name
     
-    print(f"🔄 Processing chapter-based archive {folder_name}...")
+    log.info(f"🔄 Processing chapter-based archive {folder_name}...")
     
     # Handle nested structure - check if there's a single nested directory
-    nested_dirs = [d for d in folder_path.iterdir() if d.is_dir()]
+    nested_dirs = subdirectories(folder_path)
     if len(nested_dirs) == 1:
         nested_dir = nested_dirs[0]
         # Check if the nested directory contains chapter directories
-        nested_chapter_dirs = [d for d in nested_dir.iterdir() if d.is_dir()]
-        has_chapters_in_nested = any(
-            any(list(d.glob(f"*{ext}")) or list(d.glob(f"*{ext.upper()}")) 
-                for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'])
-            for d in nested_chapter_dirs
-        )
+        nested_chapter_dirs = subdirectories(nested_dir)
+        has_chapters_in_nested = any(dir_has_images(d) for d in nested_chapter_dirs)
         if has_chapters_in_nested:
-            print(f"   📁 Using nested directory structure: {nested_dir.name}")
+            log.info(f"   📁 Using nested directory structure: {nested_dir.name}")
             folder_path = nested_dir
     
     # Find all chapter directories (subdirectories containing images)
-    chapter_dirs = []
-    for item in folder_path.iterdir():
-        if item.is_dir():
-            # Check if this directory contains image files
-            has_images = False
-            for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-                if list(item.glob(f"*{ext}")) or list(item.glob(f"*{ext.upper()}")):
-                    has_images = True
-                    break
-            if has_images:
-                chapter_dirs.append(item)
+    # Keep subdirectories that contain image files
+    chapter_dirs = [d for d in subdirectories(folder_path) if dir_has_images(d)]
     
     if not chapter_dirs:
-        print(f"❌ No chapter directories with images found in {folder_path}")
+        log.error(f"❌ No chapter directories with images found in {folder_path}")
         return False
     
     # Sort chapter directories for consistent processing
     chapter_dirs.sort(key=lambda x: x.name)
     
-    print(f"   Found {len(chapter_dirs)} chapter directories:")
+    log.info(f"   Found {len(chapter_dirs)} chapter directories:")
     for chapter_dir in chapter_dirs:
-        print(f"     - {chapter_dir.name}/")
+        log.info(f"     - {chapter_dir.name}/")
     
-    # Process each chapter separately
-    successful_chapters = 0
-    for chapter_dir in chapter_dirs:
-        print(f"\n📖 Processing chapter: {chapter_dir.name}")
-        
-        # Create chapter-specific output
-        chapter_json = output_dir / f"{folder_name}_{chapter_dir.name}.json"
-        temp_json_dir = output_dir / f"{folder_name}_{chapter_dir.name}_temp"
-        temp_json_dir.mkdir(exist_ok=True)
-        
-        # Get all image files in this chapter
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']
-        image_files = []
-        
-        for ext in image_extensions:
-            image_files.extend(chapter_dir.glob(f"*{ext}"))
-            image_files.extend(chapter_dir.glob(f"*{ext.upper()}"))
-        
-        # Sort files for consistent processing
-        image_files.sort()
-        
-        if not image_files:
-            print(f"   ⚠️  No image files found in {chapter_dir.name}")
-            continue
-        
-        print(f"   Found {len(image_files)} image files in {chapter_dir.name}")
-        
-        # Process each image in this chapter
-        json_files = []
-        successful_images = 0
-        
-        for image_file in image_files:
-            success, json_file = process_image_with_kumiko(image_file, temp_json_dir)
-            if success and json_file and json_file.exists():
-                json_files.append(json_file)
-                successful_images += 1
-            else:
-                print(f"   ⚠️  Failed to process {image_file.name}")
-        
-        print(f"   Successfully processed {successful_images}/{len(image_files)} images in {chapter_dir.name}")
-        
-        if not json_files:
-            print(f"   ❌ No JSON files were generated for {chapter_dir.name}")
-            continue
-        
-        # Combine all JSON files into single JSON for this chapter
-        success = combine_jsons_to_json(json_files, chapter_json, chapter_name=chapter_dir.name)
-        
-        if success:
-            successful_chapters += 1
-            print(f"   ✅ Chapter {chapter_dir.name} completed successfully")
-        
-        # Clean up temporary JSON files
-        try:
-            import shutil
-            shutil.rmtree(temp_json_dir)
-            print(f"   🧹 Cleaned up temporary files for {chapter_dir.name}")
-        except Exception as e:
-            print(f"   ⚠️  Could not clean up temp files for {chapter_dir.name}: {e}")
+    # Process chapters side by side, splitting the --workers Kumiko processes between them
+    chapter_workers = max(1, min(workers, len(chapter_dirs)))
+    per_chapter_workers = max(1, workers // chapter_workers)
+    with ThreadPoolExecutor(max_workers=chapter_workers) as pool:
+        results = list(pool.map(lambda chapter_dir: process_chapter(chapter_dir, output_dir / f"{folder_name}_{chapter_dir.name}.json",
+                                                                    per_chapter_workers),
+                                chapter_dirs))
+    successful_chapters = sum(1 for success, total_pages in results if success)
     
-    print(f"\n📊 Successfully processed {successful_chapters}/{len(chapter_dirs)} chapters")
+    log.info(f"\n📊 Successfully processed {successful_chapters}/{len(chapter_dirs)} chapters")
     
     if successful_chapters == 0:
-        print(f"❌ No chapters were processed successfully")
+        log.error(f"❌ No chapters were processed successfully")
         return False
     
     # Create master index with Pydantic validation
     try:
+        # Page counts come straight from the combine step instead of re-reading each chapter JSON
         chapters_data = []
-        for chapter_dir in chapter_dirs:
-            chapter_json = output_dir / f"{folder_name}_{chapter_dir.name}.json"
-            if chapter_json.exists():
-                with open(chapter_json, 'r', encoding='utf-8') as f:
-                    chapter_data = json.load(f)
+        for chapter_dir, (success, total_pages) in zip(chapter_dirs, results):
+            if success:
                 chapters_data.append({
                     "name": chapter_dir.name,
                     "json_file": f"{folder_name}_{chapter_dir.name}.json",
-                    "total_pages": chapter_data.get("total_pages", 0)
+                    "total_pages": total_pages
                 })
         
         master_index = MangaIndex(
@@ -1146,142 +1537,147 @@ def process_chapter_based_archive(folder_path, output_dir):
         )
         
         master_json = output_dir / f"{folder_name}.json"
-        with open(master_json, 'w', encoding='utf-8') as f:
-            # Convert MangaIndex to dict for JSON serialization
-            master_data = {
-                "archive_name": master_index.archive_name,
-                "total_chapters": master_index.total_chapters,
-                "chapters": master_index.chapters,
-                "reading_direction": master_index.reading_direction
-            }
-            json.dump(master_data, f, indent=2, ensure_ascii=False)
-        print(f"✅ Created master index: {master_json}")
+        # Convert MangaIndex to dict for JSON serialization
+        master_data = {
+            "archive_name": master_index.archive_name,
+            "total_chapters": master_index.total_chapters,
+            "chapters": master_index.chapters,
+            "reading_direction": master_index.reading_direction
+        }
+        dump_json(master_data, master_json)
+        log.info(f"✅ Created master index: {master_json}")
         return True
     except Exception as e:
-        print(f"❌ Error creating master index: {e}")
+        log.error(f"❌ Error creating master index: {e}")
         return False
 
-def process_with_kumiko(folder_path, output_dir):
+def process_with_kumiko(folder_path, output_dir, workers=DEFAULT_WORKERS):
     """Process a folder with Kumiko by processing each image separately."""
     folder_name = folder_path.name
     output_json = output_dir / f"{folder_name}.json"
     temp_json_dir = output_dir / f"{folder_name}_temp"
     temp_json_dir.mkdir(exist_ok=True)
     
-    print(f"🔄 Processing folder {folder_name} with individual image processing...")
+    log.info(f"🔄 Processing folder {folder_name} with individual image processing...")
     
-    # Get all image files in the folder and subdirectories
-    image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']
-    image_files = []
-    
-    for ext in image_extensions:
-        # Search in current folder and all subdirectories
-        image_files.extend(folder_path.rglob(f"*{ext}"))
-        image_files.extend(folder_path.rglob(f"*{ext.upper()}"))
-    
-    # Sort files for consistent processing
-    image_files.sort()
+    # Get all image files in the folder and subdirectories (one walk), sorted for consistent processing
+    image_files = list_images(folder_path, recursive=True)
     
     if not image_files:
-        print(f"❌ No image files found in {folder_path} or its subdirectories")
-        print(f"   Contents of {folder_path}:")
+        log.error(f"❌ No image files found in {folder_path} or its subdirectories")
+        log.info(f"   Contents of {folder_path}:")
         try:
             for item in folder_path.rglob("*"):
                 if item.is_file():
-                    print(f"     - {item.relative_to(folder_path)}")
+                    log.info(f"     - {item.relative_to(folder_path)}")
                 elif item.is_dir():
-                    print(f"     📁 {item.relative_to(folder_path)}/")
+                    log.info(f"     📁 {item.relative_to(folder_path)}/")
         except Exception as e:
-            print(f"     Could not list contents: {e}")
+            log.error(f"     Could not list contents: {e}")
         return False
     
-    print(f"   Found {len(image_files)} image files in {folder_path} and subdirectories")
-    
-    # Process each image separately
-    json_files = []
-    successful_images = 0
+    log.info(f"   Found {len(image_files)} image files in {folder_path} and subdirectories")
     
-    for image_file in image_files:
-        success, json_file = process_image_with_kumiko(image_file, temp_json_dir)
-        if success and json_file and json_file.exists():
-            json_files.append(json_file)
-            successful_images += 1
-        else:
-            print(f"   ⚠️  Failed to process {image_file.name}")
+    # Process each image separately, several at a time
+    json_files = process_images_with_kumiko(image_files, temp_json_dir, workers)
+    successful_images = len(json_files)
     
-    print(f"   Successfully processed {successful_images}/{len(image_files)} images")
+    log.info(f"   Successfully processed {successful_images}/{len(image_files)} images")
     
     if not json_files:
-        print(f"❌ No JSON files were generated")
+        log.error(f"❌ No JSON files were generated")
         return False
     
     # List all JSON files that were actually created
-    print(f"   JSON files created:")
+    log.info(f"   JSON files created:")
     for json_file in json_files:
-        print(f"     - {json_file.name}")
+        log.info(f"     - {json_file.name}")
     
     # Combine all JSON files into single JSON
-    success = combine_jsons_to_json(json_files, output_json)
+    success, _ = combine_jsons_to_json(json_files, output_json)
     
     # Clean up temporary JSON files
     try:
-        import shutil
         shutil.rmtree(temp_json_dir)
-        print(f"   🧹 Cleaned up temporary files")
+        log.info(f"   🧹 Cleaned up temporary files")
     except Exception as e:
-        print(f"   ⚠️  Could not clean up temp files: {e}")
+        log.warning(f"   ⚠️  Could not clean up temp files: {e}")
     
     return success
 
+def subdirectories(directory):
+    """Folders directly inside directory, typed from the scandir entries without a stat() each."""
+    with os.scandir(directory) as entries:
+        return [Path(entry.path) for entry in entries if entry.is_dir()]
+
+def list_images(directory, recursive=False):
+    """Sorted image files in directory (and below it with recursive), typed from scandir entries.
+
+    Like Path.rglob, recursion does not follow symlinked folders.
+    """
+    images, pending = [], [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if recursive and not entry.is_symlink():
+                        pending.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                    images.append(Path(entry.path))
+    images.sort()
+    return images
+
+def dir_has_images(directory):
+    """Check whether directory directly contains an image, stopping at the first one."""
+    try:
+        with os.scandir(directory) as entries:
+            return any(entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+                       for entry in entries)
+    except OSError:
+        return False
+
 def is_chapter_based_archive(folder_path):
     """Check if a folder contains chapter directories (KOReader-style structure)."""
     if not folder_path.is_dir():
         return False
     
-    print(f"   🔍 Checking for chapter-based structure in {folder_path}")
+    log.info(f"   🔍 Checking for chapter-based structure in {folder_path}")
     
     # Count subdirectories that contain images
     chapter_dirs = 0
     image_files_in_root = 0
     
     # First, check if there's a nested structure (e.g., 3/3/ch1, 3/3/ch2)
-    nested_dirs = [d for d in folder_path.iterdir() if d.is_dir()]
+    nested_dirs = subdirectories(folder_path)
     
     # If there's only one subdirectory, check inside it for chapters
     if len(nested_dirs) == 1:
         nested_dir = nested_dirs[0]
-        print(f"   📁 Found single nested directory: {nested_dir.name}, checking inside...")
+        log.info(f"   📁 Found single nested directory: {nested_dir.name}, checking inside...")
         folder_path = nested_dir
     
-    for item in folder_path.iterdir():
-        if item.is_dir():
-            # Check if this subdirectory contains images
-            has_images = False
-            image_count = 0
-            for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-                images = list(item.glob(f"*{ext}")) + list(item.glob(f"*{ext.upper()}"))
-                image_count += len(images)
-                if images:
-                    has_images = True
-                    break
-            if has_images:
-                chapter_dirs += 1
-                print(f"   📖 Found chapter directory: {item.name} with {image_count} images")
-        elif item.is_file() and item.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-            image_files_in_root += 1
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                # One scandir per subdirectory, stopping at its first image
+                if dir_has_images(entry.path):
+                    chapter_dirs += 1
+                    log.info(f"   📖 Found chapter directory: {entry.name}")
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                image_files_in_root += 1
     
-    print(f"   📊 Found {chapter_dirs} chapter directories and {image_files_in_root} images in root")
+    log.info(f"   📊 Found {chapter_dirs} chapter directories and {image_files_in_root} images in root")
     
     # Consider it chapter-based if there are multiple chapter directories
     # Also consider it chapter-based if there's at least 1 chapter directory and few/no images in root
     return chapter_dirs >= 2 or (chapter_dirs >= 1 and image_files_in_root <= 2)
 
-def process_input(input_path, pages_dir, panel_result_dir):
+def process_input(input_path, pages_dir, panel_result_dir, workers=DEFAULT_WORKERS):
     """Process input path (folder or archive)."""
     input_path = Path(input_path)
     
     if not input_path.exists():
-        print(f"❌ Input path does not exist: {input_path}")
+        log.error(f"❌ Input path does not exist: {input_path}")
         return False
     
     if is_archive(input_path):
@@ -1289,32 +1685,51 @@ def process_input(input_path, pages_dir, panel_result_dir):
         extract_folder = pages_dir / input_path.stem
         extract_folder.mkdir(exist_ok=True)
         
-        print(f"📦 Processing archive: {input_path}")
+        log.info(f"📦 Processing archive: {input_path}")
         if not extract_archive(input_path, extract_folder):
             return False
         
         # Check if this is a chapter-based archive (KOReader style)
         if is_chapter_based_archive(extract_folder):
-            print(f"📚 Detected chapter-based archive structure")
-            return process_chapter_based_archive(extract_folder, panel_result_dir)
+            log.info(f"📚 Detected chapter-based archive structure")
+            return process_chapter_based_archive(extract_folder, panel_result_dir, workers)
         else:
-            print(f"📖 Processing as standard archive")
-            return process_with_kumiko(extract_folder, panel_result_dir)
+            log.info(f"📖 Processing as standard archive")
+            return process_with_kumiko(extract_folder, panel_result_dir, workers)
         
     elif input_path.is_dir():
         # Check if this is a chapter-based directory
         if is_chapter_based_archive(input_path):
-            print(f"📚 Detected chapter-based directory structure")
-            return process_chapter_based_archive(input_path, panel_result_dir)
+            log.info(f"📚 Detected chapter-based directory structure")
+            return process_chapter_based_archive(input_path, panel_result_dir, workers)
         else:
             # Process folder directly
-            print(f"📁 Processing folder: {input_path}")
-            return process_with_kumiko(input_path, panel_result_dir)
+            log.info(f"📁 Processing folder: {input_path}")
+            return process_with_kumiko(input_path, panel_result_dir, workers)
         
     else:
-        print(f"❌ Unsupported input type: {input_path}")
+        log.error(f"❌ Unsupported input type: {input_path}")
         return False
 
+def configure_logging(level):
+    """Send records through a queue so worker threads never wait on stdout; one listener thread writes them."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description="Process manga folders/archives with Kumiko and Pydantic V2 validation")
     parser.add_argument('input', nargs='?', help='Input folder or archive file')
@@ -1323,21 +1738,32 @@ def main():
     parser.add_argument('--export-schema', action='store_true', help='Export Pydantic schema to JSON file')
     parser.add_argument('--validate', help='Validate existing JSON file against schema')
     parser.add_argument('--schema-file', default='manga_schema.json', help='Schema file name for export')
+    parser.add_argument('--verbose', action='store_true', help='Also print per-page image and match details and every normalized panel')
+    parser.add_argument('--quiet', action='store_true', help='Only print errors')
+    parser.add_argument('--compact', action='store_true', help='Write output JSON without indentation (smaller, faster to write)')
+    parser.add_argument('--workers', type=positive_int, default=DEFAULT_WORKERS,
+                        help=f'Images processed in parallel (default: {DEFAULT_WORKERS})')
     
     args = parser.parse_args()
     
+    level = logging.ERROR if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    configure_logging(level)
+    
+    global COMPACT_JSON
+    COMPACT_JSON = args.compact
+    
     # Handle schema export
     if args.export_schema:
-        print("📄 Exporting Pydantic V2 schema...")
+        log.info("📄 Exporting Pydantic V2 schema...")
         success = export_schema(args.schema_file)
         sys.exit(0 if success else 1)
     
     # Handle validation
     if args.validate:
-        print("� Validating JSON file against schema...")
+        log.info("� Validating JSON file against schema...")
         json_file = Path(args.validate)
         if not json_file.exists():
-            print(f"❌ File not found: {json_file}")
+            log.error(f"❌ File not found: {json_file}")
             sys.exit(1)
         
         success = validate_json_file(json_file)
@@ -1346,35 +1772,35 @@ def main():
     # Require input for processing
     if not args.input:
         parser.print_help()
-        print("\n❌ Input file/folder is required for processing")
+        log.error("\n❌ Input file/folder is required for processing")
         sys.exit(1)
     
-    print("�� Manga Processing Script with Pydantic V2 Started")
-    print("=" * 50)
+    log.info("�� Manga Processing Script with Pydantic V2 Started")
+    log.info("=" * 50)
     
     # Create directories in Kumiko folder
     pages_dir, panel_result_dir = create_kumiko_directories()
     
     # Process input
-    success = process_input(args.input, pages_dir, panel_result_dir)
+    success = process_input(args.input, pages_dir, panel_result_dir, args.workers)
     
-    print("=" * 50)
+    log.info("=" * 50)
     if success:
-        print("🎉 Processing completed successfully!")
-        print(f"📂 Results in: {panel_result_dir.absolute()}")
+        log.info("🎉 Processing completed successfully!")
+        log.info(f"📂 Results in: {panel_result_dir.absolute()}")
         
         # Validate output files
-        print("\n🔍 Validating output files against Pydantic schema...")
+        log.info("\n🔍 Validating output files against Pydantic schema...")
         output_files = list(panel_result_dir.glob("*.json"))
         valid_files = 0
         for output_file in output_files:
             if validate_json_file(output_file):
                 valid_files += 1
         
-        print(f"📊 Validation Summary: {valid_files}/{len(output_files)} files passed schema validation")
+        log.info(f"📊 Validation Summary: {valid_files}/{len(output_files)} files passed schema validation")
         
     else:
-        print("❌ Processing failed!")
+        log.error("❌ Processing failed!")
         sys.exit(1)
 
 if __name__ == "__main__":
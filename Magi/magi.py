@@ -1,101 +1,638 @@
-import torch
-import json
 import os
-import argparse
-import numpy as np
+
+# Persist torch.compile artifacts next to the script so warm-up is paid once
+os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR",
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), ".torchinductor_cache"))
+# Less allocator fragmentation on 4GB cards (must be set before torch initialises CUDA)
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF",
+                      "expandable_segments:True,max_split_size_mb:128,garbage_collection_threshold:0.8")
+
+import json
+import sys
+import atexit
+import contextlib
+import importlib.util
+import inspect
+import logging
+import queue
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import warnings
-import transformers.modeling_utils
-from PIL import Image
-from transformers import AutoModel
+from collections.abc import Mapping
+from types import SimpleNamespace
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- 1. CONFIGURATION ---
 warnings.filterwarnings("ignore")
 
-_old_mark_tied = transformers.modeling_utils.PreTrainedModel.mark_tied_weights_as_initialized
-def _patched_mark_tied(self):
-    if not hasattr(self, 'all_tied_weights_keys'):
-        self.all_tied_weights_keys = {}
-    return _old_mark_tied(self)
-transformers.modeling_utils.PreTrainedModel.mark_tied_weights_as_initialized = _patched_mark_tied
+# Status lines go through a queue so a slow stdout reader never stalls inference
+log = logging.getLogger("magi")
+if not log.handlers:
+    _log_queue = queue.SimpleQueue()
+    _stdout_handler = logging.StreamHandler(sys.stdout)
+    _stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = QueueListener(_log_queue, _stdout_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    log.addHandler(QueueHandler(_log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+# Set by import_runtime() once torch is loaded
+DEVICE = None
+
+# Fixed input bucket so torch.compile does not re-trace per page size
+MAX_DIM = 800
+
+# Long-lived worker (--serve) keeps the model resident between requests
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "magi.sock")
+# Seconds a client waits on the daemon per page, the same budget process_manga.py gives a magi.py run
+CLIENT_TIMEOUT_PER_IMAGE = 120
+
+def import_runtime():
+    """Import torch, transformers & co. on first use, so --stop and bad-input paths exit instantly."""
+    global torch, nn, np, Image, AutoModel, fuse_conv_bn_weights, DEVICE
+    global ImageReadMode, decode_jpeg, read_file, InterpolationMode, resize
+    global TJPF_RGB, turbo_jpeg
+    if DEVICE is not None:
+        return
+
+    import torch
+    import numpy as np
+    import transformers.modeling_utils
+    from torch import nn
+    from torch.nn.utils.fusion import fuse_conv_bn_weights
+    from PIL import Image
+    from transformers import AutoModel
+
+    try:
+        from torchvision.io import ImageReadMode, decode_jpeg, read_file
+        from torchvision.transforms.v2.functional import InterpolationMode, resize
+    except ImportError:
+        decode_jpeg = None
+
+    try:
+        from turbojpeg import TJPF_RGB, TurboJPEG
+        turbo_jpeg = TurboJPEG()
+    except (ImportError, OSError, RuntimeError):
+        turbo_jpeg = None  # PyTurboJPEG not installed or libturbojpeg not found
+
+    # Older transformers have no mark_tied_weights_as_initialized and need no patch;
+    # the flag keeps re-imports from wrapping the wrapper again
+    old_mark_tied = getattr(transformers.modeling_utils.PreTrainedModel, "mark_tied_weights_as_initialized", None)
+    if old_mark_tied is not None and not getattr(old_mark_tied, "_magi_patched", False):
+        def _patched_mark_tied(self):
+            if not hasattr(self, 'all_tied_weights_keys'):
+                self.all_tied_weights_keys = {}
+            return old_mark_tied(self)
+        _patched_mark_tied._magi_patched = True
+        transformers.modeling_utils.PreTrainedModel.mark_tied_weights_as_initialized = _patched_mark_tied
+
+    # Input shape is fixed, so let cuDNN benchmark once and reuse the fastest kernels
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.set_float32_matmul_precision("high")
+
+    DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+def compile_submodules(model):
+    """Compile each top-level submodule with CUDA Graphs.
+
+    predict_detections_and_associations() calls the submodules directly instead
+    of model.forward, so wrapping the model itself would never hit the graph.
+    """
+    for name, child in list(model.named_children()):
+        setattr(model, name, torch.compile(child, mode="reduce-overhead", dynamic=False))
+    return model
+
+def _is_batchnorm(module):
+    # The DETR-style backbone uses FrozenBatchNorm2d: same buffers as BatchNorm2d, no nn base class
+    return isinstance(module, nn.BatchNorm2d) or type(module).__name__.endswith("FrozenBatchNorm2d")
+
+def _fuse_pair(conv, bn):
+    """Fold an eval-mode BN into the preceding conv; computed in float32, stored in the conv's dtype."""
+    dtype = conv.weight.dtype
+    weight, bias = fuse_conv_bn_weights(
+        conv.weight.float(), None if conv.bias is None else conv.bias.float(),
+        bn.running_mean.float(), bn.running_var.float(), getattr(bn, "eps", 1e-5),
+        None if bn.weight is None else bn.weight.float(), None if bn.bias is None else bn.bias.float())
+    conv.weight = nn.Parameter(weight.detach().to(dtype), requires_grad=False)
+    conv.bias = nn.Parameter(bias.detach().to(dtype), requires_grad=False)
 
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+def fuse_conv_bn(model):
+    """Fold BatchNorm into Conv2d for Sequential conv->bn runs and ResNet-style convN/bnN pairs.
 
-def load_model():
-    model = AutoModel.from_pretrained("ragavsachdeva/magiv2", trust_remote_code=True)
+    The remote magiv2 code has data-dependent control flow, so torch.fx tracing is not an option;
+    only pairs whose order is guaranteed by the module structure are touched.
+    """
+    fused = 0
+    for module in model.modules():
+        children = list(module.named_children())
+        for (conv_name, conv), (bn_name, bn) in zip(children, children[1:]):
+            if not (isinstance(conv, nn.Conv2d) and _is_batchnorm(bn)):
+                continue
+            if isinstance(module, nn.Sequential) or (conv_name.startswith("conv") and bn_name == "bn" + conv_name[4:]):
+                _fuse_pair(conv, bn)
+                setattr(module, bn_name, nn.Identity())
+                fused += 1
+    return fused
+
+def int8_supported():
+    """LLM.int8 kernels need bitsandbytes and a Volta+ GPU; a 1050 Ti (6.1) stays on FP16."""
+    if DEVICE != "cuda" or importlib.util.find_spec("bitsandbytes") is None:
+        return False
+    return torch.cuda.get_device_capability()[0] >= 7
+
+def load_model(compile_model=False, int8=False, batch_size=1):
+    import_runtime()
+    load_kwargs = {"trust_remote_code": True}
     if DEVICE == "cuda":
-        model = model.half().to(DEVICE)
+        # Leave headroom for the desktop compositor sharing the GPU
+        torch.cuda.set_per_process_memory_fraction(0.9)
+        # Stream FP16 weights from the safetensors mmap straight to the GPU, no FP32 copy in RAM
+        load_kwargs.update(dtype=torch.float16, device_map=DEVICE)
+    if int8 and int8_supported():
+        # bitsandbytes swaps every nn.Linear for Linear8bitLt while loading:
+        # per-channel int8 weights, outlier activations kept in FP16
+        from transformers import BitsAndBytesConfig
+        load_kwargs["quantization_config"] = BitsAndBytesConfig(load_in_8bit=True)
+    elif int8:
+        log.warning("⚠️  INT8 needs bitsandbytes and compute capability 7.0+, using FP16.")
+    model = AutoModel.from_pretrained("ragavsachdeva/magiv2", **load_kwargs)
     model.eval()
+    fuse_conv_bn(model)
+    if compile_model and DEVICE == "cuda":
+        with torch.inference_mode():
+            model = compile_submodules(model)
+        warm_up(model, batch_sizes=sorted({1, batch_size}))
     return model
 
+def warm_up(model, batch_sizes=(1,), passes=2):
+    """Pay the compile cost at startup: pass 1 traces + codegens, pass 2 records the CUDA Graph.
+
+    dynamic=False keeps one graph per batch size. detect_files only ever runs full batch_size
+    chunks and single pages, so warming {1, batch_size} covers every call.
+    """
+    dummy = np.zeros((MAX_DIM, MAX_DIM, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for batch_size in batch_sizes:
+        for _ in range(passes):
+            run_detection(model, [dummy] * batch_size)
+    torch.cuda.synchronize()
+    log.info(f"🔥 Warm-up finished in {time.perf_counter() - start:.1f}s")
+
 def boxes_overlap(box1, box2, threshold=0):
-    """Check if two boxes [x1, y1, x2, y2] overlap spatially."""
-    return not (box1[2] < box2[0] - threshold or 
-                box1[0] > box2[2] + threshold or 
-                box1[3] < box2[1] - threshold or 
-                box1[1] > box2[3] + threshold)
-
-def get_inclusive_panels(image_path, model):
-    img = Image.open(image_path).convert("RGB")
+    """Check if boxes [x1, y1, x2, y2] overlap spatially (broadcasts over leading axes)."""
+    box1, box2 = np.asarray(box1), np.asarray(box2)
+    return ~((box1[..., 2] < box2[..., 0] - threshold) | 
+             (box1[..., 0] > box2[..., 2] + threshold) | 
+             (box1[..., 3] < box2[..., 1] - threshold) | 
+             (box1[..., 1] > box2[..., 3] + threshold))
+
+class InputStager:
+    """Reuse pinned host and device buffers for inputs that keep the same key and shape.
+
+    With fixed-size pages the processor emits identical shapes every call, so after the
+    first page no pinned or device memory is allocated on the hot path.
+    """
+    def __init__(self, max_slots=8):
+        self.max_slots = max_slots
+        self._slots = {}
+
+    def stage(self, tensor, dtype, key):
+        target = dtype if tensor.is_floating_point() else tensor.dtype
+        slot = (key, tuple(tensor.shape), tensor.dtype, target)
+        if slot not in self._slots:
+            if len(self._slots) >= self.max_slots:
+                self._slots.pop(next(iter(self._slots)))  # drop the oldest shape
+            host = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+            self._slots[slot] = (host, torch.empty(tensor.shape, dtype=target, device=DEVICE), torch.cuda.Event())
+        host, device, copied = self._slots[slot]
+        copied.synchronize()  # previous DMA out of the host buffer must be done before overwriting it
+        host.copy_(tensor)
+        device.copy_(host, non_blocking=True)
+        copied.record()
+        return device
+
+INPUT_STAGER = InputStager()
+
+def move_to_device(inputs, dtype, stager=None, key=()):
+    """Move processor outputs to DEVICE, casting floating tensors to the model dtype there."""
+    if isinstance(inputs, torch.Tensor):
+        if DEVICE == "cuda" and inputs.device.type == "cpu":
+            if stager is not None:
+                return stager.stage(inputs, dtype, key)
+            # Page-locked source lets the H2D copy run as async DMA
+            inputs = inputs.pin_memory()
+        inputs = inputs.to(DEVICE, non_blocking=True)
+        return inputs.to(dtype) if inputs.is_floating_point() else inputs
+    if isinstance(inputs, Mapping):
+        return {name: move_to_device(value, dtype, stager, key + (name,)) for name, value in inputs.items()}
+    if isinstance(inputs, (list, tuple)):
+        return type(inputs)(move_to_device(value, dtype, stager, key + (i,)) for i, value in enumerate(inputs))
+    return inputs
+
+def accepts_move_to_device_fn(model):
+    """Check whether the remote MAGI code lets us supply the device-transfer hook."""
+    try:
+        params = inspect.signature(model.predict_detections_and_associations).parameters
+    except (TypeError, ValueError):
+        return False
+    return "move_to_device_fn" in params
+
+_decode_streams = threading.local()
+
+def decode_stream():
+    """Side CUDA stream for the calling decode thread, so nvJPEG work overlaps the running batch."""
+    stream = getattr(_decode_streams, "stream", None)
+    if stream is None:
+        stream = _decode_streams.stream = torch.cuda.Stream()
+    return stream
+
+def decode_jpeg_on_gpu(image_path, max_dim, pad_to_square=False):
+    """Decode and downscale a JPEG with nvJPEG. Returns (HWC uint8 array, width, height)."""
+    img = decode_jpeg(read_file(image_path), mode=ImageReadMode.RGB, device=DEVICE)
+    height, width = img.shape[1:]
+    if max(width, height) > max_dim:
+        # Same rounding process_manga.py uses to recover MAGI's resized size
+        scale = max_dim / max(width, height)
+        width, height = max(1, int(width * scale)), max(1, int(height * scale))
+        img = resize(img, [height, width], interpolation=InterpolationMode.BILINEAR, antialias=True)
+    
+    if pad_to_square:
+        canvas = torch.full((3, max_dim, max_dim), 255, dtype=img.dtype, device=img.device)
+        canvas[:, :height, :width] = img
+        img = canvas
+    
+    # The MAGI processor only accepts numpy images, so hand back the small resized page
+    return img.permute(1, 2, 0).contiguous().cpu().numpy(), width, height
+
+def decode_jpeg_turbo(image_path):
+    """Decode a JPEG with libjpeg-turbo at full size, like Image.open().convert("RGB"); load_image resizes it."""
+    with open(image_path, "rb") as f:
+        data = f.read()
+    return Image.fromarray(turbo_jpeg.decode(data, pixel_format=TJPF_RGB))
+
+def load_image(image_path, max_dim=MAX_DIM, pad_to_square=False):
+    """Load a page resized to fit max_dim. Returns (HWC uint8 array, width, height)."""
+    if (DEVICE == "cuda" and decode_jpeg is not None
+            and os.path.splitext(image_path)[1].lower() in (".jpg", ".jpeg")):
+        try:
+            # Off the default stream, or the prefetched decode queues behind the model's kernels
+            with torch.cuda.stream(decode_stream()):
+                return decode_jpeg_on_gpu(image_path, max_dim, pad_to_square)
+        except RuntimeError:
+            pass  # progressive/CMYK JPEGs nvJPEG rejects fall back to PIL
+    
+    img = None
+    if turbo_jpeg is not None and os.path.splitext(image_path)[1].lower() in (".jpg", ".jpeg"):
+        try:
+            img = decode_jpeg_turbo(image_path)
+        except OSError:
+            pass  # CMYK and other JPEGs TurboJPEG cannot turn into RGB fall back to PIL
+    if img is None:
+        img = Image.open(image_path).convert("RGB")
     # Using 1024 for better resolution on small text bubbles
-    max_dim = 800
     if max(img.size) > max_dim:
-        img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
-    
-    img_numpy = np.array(img)
+        img.thumbnail((max_dim, max_dim), Image.Resampling.BILINEAR)
+    width, height = img.size
     
-    with torch.no_grad():
-        context = torch.autocast(device_type="cuda", dtype=torch.float16) if DEVICE == "cuda" else torch.inference_mode()
-        with context:
-            results = model.predict_detections_and_associations([img_numpy])
+    if pad_to_square:
+        # Letterbox bottom/right so coordinates stay in the resized image's frame
+        canvas = Image.new("RGB", (max_dim, max_dim), (255, 255, 255))
+        canvas.paste(img, (0, 0))
+        img = canvas
     
-    res = results[0]
-    panels = res.get('panels', [])
-    texts = res.get('texts', []) # These are the speech bubbles
-    associations = res.get('associations', [])
+    return np.array(img), width, height
 
-    final_panels = []
+def run_detection(model, images):
+    with torch.inference_mode():
+        if DEVICE == "cuda" and accepts_move_to_device_fn(model):
+            # Pure FP16: inputs are cast on the GPU, no autocast dispatch per op
+            dtype = model.dtype
+            results = model.predict_detections_and_associations(
+                images, move_to_device_fn=lambda inputs: move_to_device(inputs, dtype, INPUT_STAGER))
+        else:
+            context = torch.autocast(device_type="cuda", dtype=torch.float16) if DEVICE == "cuda" else contextlib.nullcontext()
+            with context:
+                results = model.predict_detections_and_associations(images)
+    return results
 
-    for p_idx, panel_box in enumerate(panels):
-        x1, y1, x2, y2 = panel_box
-        
-        # 1. Expand based on Model Associations
-        associated_text_indices = [a[1] for a in associations if a[0] == p_idx]
-        
-        # 2. Expand based on Spatial Overlap (The "Safety Net")
+def merge_bubbles_into_panels(res, width, height, pad_to_square=False):
+    panels = np.asarray(res.get('panels', []), dtype=np.float64).reshape(-1, 4)
+    texts = np.asarray(res.get('texts', []), dtype=np.float64).reshape(-1, 4) # These are the speech bubbles
+    associations = np.asarray(res.get('associations', []), dtype=np.int64).reshape(-1, 2)
+
+    if len(panels) and len(texts):
+        # 1. Expand based on Spatial Overlap (The "Safety Net")
         # This catches bubbles that touch the panel but weren't 'linked' by the AI
-        for t_idx, text_box in enumerate(texts):
-            if t_idx in associated_text_indices or boxes_overlap(panel_box, text_box, threshold=5):
-                x1 = min(x1, text_box[0])
-                y1 = min(y1, text_box[1])
-                x2 = max(x2, text_box[2])
-                y2 = max(y2, text_box[3])
+        linked = boxes_overlap(panels[:, None, :], texts[None, :, :], threshold=5)
+        
+        # 2. Expand based on Model Associations
+        valid = (associations[:, 0] < len(panels)) & (associations[:, 1] < len(texts))
+        linked[associations[valid, 0], associations[valid, 1]] = True
         
-        final_panels.append([int(x1), int(y1), int(x2), int(y2)])
+        # Union each panel with every linked bubble in one pass over the (panel, text) grid
+        panels[:, :2] = np.minimum(panels[:, :2], np.where(linked[..., None], texts[None, :, :2], np.inf).min(axis=1))
+        panels[:, 2:] = np.maximum(panels[:, 2:], np.where(linked[..., None], texts[None, :, 2:], -np.inf).max(axis=1))
+    
+    if pad_to_square:
+        panels[:, 2] = np.minimum(panels[:, 2], width)
+        panels[:, 3] = np.minimum(panels[:, 3], height)
+    
+    # Single vectorized cast (truncates like int()) instead of per-coordinate int() calls
+    return panels.astype(np.int64).tolist()
+
+def load_images(image_paths, pad_to_square=False):
+    with ThreadPoolExecutor() as pool:
+        return list(pool.map(lambda path: load_image(path, pad_to_square=pad_to_square), image_paths))
+
+def detect_loaded(loaded, model, pad_to_square=False):
+    results = run_detection(model, [img_numpy for img_numpy, _, _ in loaded])
+    return [merge_bubbles_into_panels(res, width, height, pad_to_square)
+            for res, (_, width, height) in zip(results, loaded)]
+
+def get_inclusive_panels_batch(image_paths, model, pad_to_square=False):
+    """Run several pages through one model call. Returns one panel list per path."""
+    return detect_loaded(load_images(image_paths, pad_to_square), model, pad_to_square)
+
+def get_inclusive_panels(image_path, model, pad_to_square=False):
+    return get_inclusive_panels_batch([image_path], model, pad_to_square)[0]
+
+def dump_json(obj):
+    """Compact JSON bytes, via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+# --- 2. DAEMON ---
+def _send_message(conn, message):
+    """Send one newline-terminated JSON message."""
+    conn.sendall(dump_json(message) + b"\n")
+
+def _recv_message(conn):
+    """Read one newline-terminated JSON message."""
+    with conn.makefile("r", encoding="utf-8") as reader:
+        line = reader.readline()
+    return json.loads(line) if line else {}
+
+def client_send(request, socket_path=DEFAULT_SOCKET, timeout=CLIENT_TIMEOUT_PER_IMAGE):
+    """Send a request to a running daemon. Returns None if no daemon answers within timeout seconds."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(socket_path)
+            _send_message(conn, request)
+            return _recv_message(conn)
+    except OSError:
+        return None  # no daemon, a stale or foreign socket, or a daemon that hung
+
+def detect_files(image_paths, model, batch_size=1, pad_to_square=False):
+    """Answer a list of paths in model batches. Missing files get an error entry instead of panels."""
+    results = [{"error": f"File {path} not found."} for path in image_paths]
+    found = [i for i, path in enumerate(image_paths) if os.path.exists(path)]
+    # Full batches, then the leftover pages one by one: a short last chunk would be a new shape
+    # for the compiled graphs (dynamic=False) and recompile mid-run
+    full = len(found) - len(found) % batch_size
+    chunks = [found[start:start + batch_size] for start in range(0, full, batch_size)]
+    chunks += [[i] for i in found[full:]]
+
+    def prefetch(chunk):
+        return prefetcher.submit(load_images, [image_paths[i] for i in chunk], pad_to_square)
+
+    # Decode batch N+1 on a worker thread while the GPU runs batch N
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending = prefetch(chunks[0]) if chunks else None
+        for k, chunk in enumerate(chunks):
+            current = pending
+            if k + 1 < len(chunks):
+                pending = prefetch(chunks[k + 1])
+            try:
+                batch = detect_loaded(current.result(), model, pad_to_square)
+                for i, panel_coords in zip(chunk, batch):
+                    results[i] = {"panels": panel_coords}
+            except Exception as e:
+                for i in chunk:
+                    results[i] = {"error": str(e)}
+    return results
+
+def serve(socket_path=DEFAULT_SOCKET, compile_model=False, int8=False, batch_size=1):
+    """Load the model once, then answer panel requests until a shutdown sentinel arrives."""
+    if not hasattr(socket, "AF_UNIX"):
+        log.error("❌ Error: Unix domain sockets are not supported on this platform.")
+        return False
+
+    if os.path.exists(socket_path):
+        if client_send({"command": "ping"}, socket_path, timeout=5) is not None:
+            log.warning(f"⚠️  A MAGI daemon is already listening on {socket_path}")
+            return False
+        os.unlink(socket_path)  # stale socket from a crashed daemon
+
+    model = load_model(compile_model, int8, batch_size)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    log.info(f"✅ MAGI daemon listening on {socket_path}")
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                request = _recv_message(conn)
+                command = request.get("command")
+
+                if command == "shutdown":
+                    _send_message(conn, {"status": "stopped"})
+                    break
+                if command == "ping":
+                    _send_message(conn, {"status": "ok"})
+                    continue
+
+                try:
+                    if "inputs" in request:
+                        # A whole chapter in one request, run batch_size pages per model call
+                        results = detect_files(request["inputs"], model, batch_size, pad_to_square=compile_model)
+                        _send_message(conn, {"results": results})
+                    else:
+                        _send_message(conn, detect_files([request["input"]], model, pad_to_square=compile_model)[0])
+                except Exception as e:
+                    _send_message(conn, {"error": str(e)})
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        log.info("🛑 MAGI daemon stopped.")
+    return True
+
+# --- 3. EXECUTION ---
+USAGE = ("usage: magi.py [-h] [-i INPUT] [-o OUTPUT] [--batch] [--jsonl] [--serve] [--stop] [--socket SOCKET] [--compile] [--int8]\n"
+         "               [--batch-size BATCH_SIZE] [images ...]")
+
+HELP = USAGE + """
+
+positional arguments:
+  images                More page images (with --batch)
+
+options:
+  -h, --help            show this help message and exit
+  -i, --input INPUT     Page image to detect panels on
+  -o, --output OUTPUT   Where to write the panel JSON (default: panels.json); the output directory with --batch
+  --batch               Load the model once and write <stem>_panels.json per image into -o
+  --jsonl               With --batch, write one {"input", "panels"} JSON line per image to the file -o instead
+  --serve               Run as a persistent daemon that keeps the model loaded
+  --stop                Ask a running daemon to shut down
+  --socket SOCKET       Unix socket path used by the daemon
+  --compile             torch.compile the model (slow first call, best with --serve)
+  --int8                Quantize linear layers to INT8 with bitsandbytes (Volta+ GPUs)
+  --batch-size BATCH_SIZE
+                        Pages per model call for --batch runs and daemon batch requests
+"""
+
+_FLAGS = {"--batch": "batch", "--jsonl": "jsonl", "--serve": "serve", "--stop": "stop", "--compile": "compile", "--int8": "int8"}
+_OPTIONS = {"-i": "input", "--input": "input", "-o": "output", "--output": "output", "--socket": "socket", "--batch-size": "batch_size"}
+
+def usage_error(message):
+    """Report a bad command line the way argparse does (usage on stderr, exit code 2)."""
+    sys.stderr.write(f"{USAGE}\nmagi.py: error: {message}\n")
+    sys.exit(2)
+
+def parse_args(argv):
+    """Hand-rolled flag parsing: argparse costs more to import than this CLI needs."""
+    args = {"input": None, "inputs": [], "output": None, "socket": DEFAULT_SOCKET, "batch_size": "1", **dict.fromkeys(_FLAGS.values(), False)}
+    remaining = iter(argv)
+    for arg in remaining:
+        name, has_value, value = arg.partition("=")
+        if arg in ("-h", "--help"):
+            sys.stdout.write(HELP)
+            sys.exit(0)
+        if name in _OPTIONS:
+            if not has_value:
+                value = next(remaining, None)
+            if value is None:
+                usage_error(f"argument {name}: expected one argument")
+            args[_OPTIONS[name]] = value
+        elif arg in _FLAGS:
+            args[_FLAGS[arg]] = True
+        elif not arg.startswith("-") or arg == "-":
+            args["inputs"].append(arg)
+        else:
+            usage_error(f"unrecognized arguments: {arg}")
+    try:
+        args["batch_size"] = int(args["batch_size"])
+    except ValueError:
+        usage_error(f"argument --batch-size: invalid int value: '{args['batch_size']}'")
+    if args["batch_size"] < 1:
+        usage_error(f"argument --batch-size: must be at least 1, got {args['batch_size']}")
+    if args["inputs"] and not args["batch"]:
+        usage_error(f"unrecognized arguments: {' '.join(args['inputs'])}")
+    return SimpleNamespace(**args)
+
+def run_batch(image_paths, output, args):
+    """Detect panels on many pages with one model load. Returns True if any page succeeded.
+
+    output is a directory for <stem>_panels.json files, or with args.jsonl a single JSON-lines file.
+    """
+    image_paths = [os.path.abspath(path) for path in image_paths]
+    os.makedirs(os.path.dirname(os.path.abspath(output)) if args.jsonl else output, exist_ok=True)
+    batch_size = args.batch_size
 
-    return final_panels
+    response = client_send({"inputs": image_paths}, args.socket, timeout=CLIENT_TIMEOUT_PER_IMAGE * len(image_paths))
+    if response is not None and "results" not in response and "error" not in response:
+        # An empty reply: the daemon closed the connection mid-request (crash, OOM)
+        log.warning("⚠️  The MAGI daemon dropped the batch, loading the model here")
+        response = None
+    if response is None:
+        if not any(os.path.exists(path) for path in image_paths):
+            results = detect_files(image_paths, None)  # all "not found", no need to load the model
+        else:
+            model = load_model(args.compile, args.int8, batch_size)
+            results = detect_files(image_paths, model, batch_size, pad_to_square=args.compile)
+    elif "error" in response:
+        log.error(f"❌ Error: {response['error']}")
+        return False
+    else:
+        results = response["results"]
+
+    written = 0
+    lines = []
+    for image_path, result in zip(image_paths, results):
+        stem = os.path.splitext(os.path.basename(image_path))[0]
+        if "panels" not in result:
+            log.error(f"❌ {os.path.basename(image_path)}: {result['error']}")
+            continue
+        if args.jsonl:
+            lines.append(dump_json({"input": image_path, "panels": result["panels"]}))
+        else:
+            with open(os.path.join(output, f"{stem}_panels.json"), "wb") as f:
+                f.write(dump_json({"panels": result["panels"]}))
+        written += 1
+    if args.jsonl:
+        with open(output, "wb") as f:
+            f.write(b"".join(line + b"\n" for line in lines))
+
+    log.info(f"✅ Success: Processed {written}/{len(image_paths)} images.")
+    return written > 0
 
 def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('-i', '--input', required=True)
-    args = parser.parse_args()
+    args = parse_args(sys.argv[1:])
+
+    if args.serve:
+        sys.exit(0 if serve(args.socket, args.compile, args.int8, args.batch_size) else 1)
+
+    if args.stop:
+        response = client_send({"command": "shutdown"}, args.socket, timeout=30)
+        log.info("🛑 Daemon stopped." if response else "⚠️  No daemon running.")
+        return
+
+    if args.batch:
+        image_paths = ([args.input] if args.input else []) + args.inputs
+        if not image_paths:
+            usage_error("--batch needs at least one image")
+        sys.exit(0 if run_batch(image_paths, args.output or ("panels.jsonl" if args.jsonl else "."), args) else 1)
+
+    if not args.input:
+        usage_error("the following arguments are required: -i/--input")
     
     try:
-        model = load_model()
         if os.path.exists(args.input):
-            panel_coords = get_inclusive_panels(args.input, model)
+            # Reuse a running daemon when available, otherwise load the model here
+            response = client_send({"input": os.path.abspath(args.input)}, args.socket)
+            if response is not None and "panels" not in response and "error" not in response:
+                # An empty reply: the daemon closed the connection mid-request (crash, OOM)
+                log.warning("⚠️  The MAGI daemon dropped the request, loading the model here")
+                response = None
+            if response is None:
+                model = load_model(args.compile, args.int8)
+                panel_coords = get_inclusive_panels(args.input, model, pad_to_square=args.compile)
+            elif "error" in response:
+                raise RuntimeError(response["error"])
+            else:
+                panel_coords = response["panels"]
             
             # Output ONLY panel coordinates
             output = {"panels": panel_coords}
             
-            with open("panels.json", "w") as f:
-                json.dump(output, f, indent=4)
+            with open(args.output or "panels.json", "wb") as f:
+                f.write(dump_json(output))
             
-            print(f"✅ Success: Processed {len(panel_coords)} panels.")
-            print("The coordinates now include overlapping speech bubbles.")
+            log.info(f"✅ Success: Processed {len(panel_coords)} panels.")
+            log.info("The coordinates now include overlapping speech bubbles.")
         else:
-            print(f"Error: File {args.input} not found.")
+            log.error(f"Error: File {args.input} not found.")
     except Exception as e:
-        print(f"❌ Error: {e}")
+        log.error(f"❌ Error: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
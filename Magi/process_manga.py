@@ -19,50 +19,262 @@ import sys
 import subprocess
 import shutil
 import zipfile
+import tarfile
+import gzip
 import argparse
+import atexit
+import contextlib
 import json
+import mmap
+import struct
+import logging
+import queue
+import socket
+import tempfile
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
-def create_directories():
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Streams the JSON-lines results of magi.py --batch --jsonl without reading whole files
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Only needed for page sizes of non-PNG/JPEG images
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Optional in-process RAR/7Z readers; the unrar/7z commands are used otherwise
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+try:
+    import py7zr
+except ImportError:
+    py7zr = None
+
+# magi.py runs in a child process, so threads are enough; keep it small to share VRAM
+DEFAULT_WORKERS = min(2, os.cpu_count() or 1)
+
+# Everything is resolved against the script's own folder, not the cwd
+SCRIPT_DIR = Path(__file__).resolve().parent
+MAGI_SCRIPT = SCRIPT_DIR / "magi.py"
+PAGES_DIR = SCRIPT_DIR / "Pages"
+PANEL_RESULT_DIR = SCRIPT_DIR / "panel_result"
+# Where magi.py --serve listens by default (DEFAULT_SOCKET in magi.py)
+MAGI_SOCKET = os.path.join(tempfile.gettempdir(), "magi.sock")
+
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'})
+ARCHIVE_EXTENSIONS = frozenset({'.cbz', '.zip', '.rar', '.7z', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz'})
+
+# Progress goes through logging: per-panel lines at DEBUG (--verbose), everything but errors off with --quiet
+log = logging.getLogger("panelreader")
+
+# Images per `magi.py --batch` call, bounded so the command line fits everywhere (Windows: 32K chars)
+MAX_BATCH_IMAGES = 500
+MAX_BATCH_ARGV_CHARS = 30000
+
+# Extra magi.py options for every batch and the --daemon server, filled in from the command line by main()
+MAGI_OPTIONS = []
+
+# The plugin is the only reader of the panel JSON, so it is written without indentation unless main() sets --pretty
+PRETTY_JSON = False
+
+# Written into an archive's extract folder with the archive's size and mtime (see archive_signature)
+EXTRACTED_MARKER = '.extracted_ok'
+
+# Below this a plain read() is cheaper than setting up a mapping
+MMAP_MIN_BYTES = 1 << 12
+
+def load_json(path):
+    """Read a JSON file, via orjson when installed (straight from a memory map for larger files)."""
+    with open(path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return orjson.loads(view)
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def iter_jsonl(path):
+    """Yield each record of a JSON-lines file, streamed via ijson when installed."""
+    with open(path, 'rb') as f:
+        if ijson is not None:
+            yield from ijson.items(f, '', multiple_values=True, use_float=True)
+        else:
+            loads = orjson.loads if orjson is not None else json.loads
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+
+def dump_json(obj, path):
+    """Write a JSON file, compact unless PRETTY_JSON is set, via orjson when installed."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if PRETTY_JSON else 0))
+    else:
+        # dumps, not dump: json.dump always takes the pure-Python encoder
+        text = json.dumps(obj, indent=2, ensure_ascii=False) if PRETTY_JSON else compact_json(obj)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+def compact_json(obj):
+    """Serialize obj without whitespace, via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+def create_directories(pages_dir=PAGES_DIR, panel_result_dir=PANEL_RESULT_DIR):
     """Create Pages and panel_result folders."""
-    # Get the directory where this script is located
-    script_dir = Path(__file__).parent
-    pages_dir = script_dir / "Pages"
-    panel_result_dir = script_dir / "panel_result"
-    
     pages_dir.mkdir(exist_ok=True)
     panel_result_dir.mkdir(exist_ok=True)
     
-    print(f"✅ Created/verified directories:")
-    print(f"   Pages: {pages_dir.absolute()}")
-    print(f"   panel_result: {panel_result_dir.absolute()}")
+    log.info(f"✅ Created/verified directories:")
+    log.info(f"   Pages: {pages_dir.absolute()}")
+    log.info(f"   panel_result: {panel_result_dir.absolute()}")
     
     return pages_dir, panel_result_dir
 
 def detect_file_type(file_path):
-    """Detect actual file type using file command."""
+    """Detect actual file type from its magic bytes."""
     try:
-        result = subprocess.run(['file', str(file_path)], 
-                              capture_output=True, text=True, check=True)
-        output = result.stdout.strip()
-        
-        if 'Zip archive' in output:
-            return 'zip'
-        elif 'RAR archive' in output:
-            return 'rar'
-        elif '7-zip' in output:
-            return '7z'
-        elif 'tar' in output.lower():
-            return 'tar'
-        elif 'gzip compressed' in output:
-            return 'gzip'
+        with open(file_path, 'rb') as f:
+            head = f.read(264)
+    except OSError as e:
+        log.warning(f"⚠️  File type detection not available: {e}")
+        return None
+    
+    if head.startswith((b'PK\x03\x04', b'PK\x05\x06')):  # empty archives only have the end record
+        return 'zip'
+    elif head.startswith(b'Rar!\x1a\x07'):
+        return 'rar'
+    elif head.startswith(b'7z\xbc\xaf\x27\x1c'):
+        return '7z'
+    elif head[257:262] == b'ustar':
+        return 'tar'
+    elif head.startswith(b'\x1f\x8b'):
+        return 'gzip'
+    else:
+        log.info(f"🔍 File detection: unknown signature {head[:8].hex()}")
+        return None
+
+# Members are streamed to disk in chunks this big (zipfile.extract copies 64 KiB at a time)
+ZIP_COPY_CHUNK = 1 << 20
+# Read buffer for the archive itself; ZipFile(path) uses the 8 KiB default, one read() per tiny header
+ZIP_READ_BUFFER = 1 << 17
+# Fixed part of a ZIP local file header; the name and extra field follow it
+ZIP_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+@contextlib.contextmanager
+def open_zip(archive_path):
+    """zipfile.ZipFile(archive_path) reading through a ZIP_READ_BUFFER-sized buffer."""
+    with open(archive_path, 'rb', buffering=ZIP_READ_BUFFER) as f, zipfile.ZipFile(f) as zip_ref:
+        yield zip_ref
+
+def zip_member_target(info, extract_to):
+    """The path zipfile.extract would write info to: drive, root and "."/".." parts dropped."""
+    name = info.filename.replace('/', os.path.sep)
+    if os.path.altsep:
+        name = name.replace(os.path.altsep, os.path.sep)
+    parts = [part for part in os.path.splitdrive(name)[1].split(os.path.sep) if part not in ('', '.', '..')]
+    return os.path.join(extract_to, *parts)
+
+def sendfile_stored_member(zip_ref, info, dst):
+    """Copy a stored, unencrypted member's bytes into dst in-kernel. Returns False if not possible."""
+    if (not hasattr(os, 'sendfile') or not sys.platform.startswith('linux')
+            or info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1):
+        return False
+    src_fd = zip_ref.fp.fileno()
+    header = os.pread(src_fd, ZIP_LOCAL_HEADER.size, info.header_offset)
+    if len(header) != ZIP_LOCAL_HEADER.size or header[:4] != zipfile.stringFileHeader:
+        return False
+    fields = ZIP_LOCAL_HEADER.unpack(header)
+    offset = info.header_offset + ZIP_LOCAL_HEADER.size + fields[9] + fields[10]
+    remaining = info.file_size
+    try:
+        while remaining:
+            sent = os.sendfile(dst.fileno(), src_fd, offset, remaining)
+            if not sent:
+                break  # truncated archive; let zipfile raise the proper error
+            offset += sent
+            remaining -= sent
+    except OSError:
+        remaining = info.file_size  # filesystem refuses sendfile, redo the copy in userspace
+    if remaining:
+        dst.seek(0)
+        dst.truncate()
+        return False
+    return True
+
+def extract_member(zip_ref, info, extract_to):
+    """zip_ref.extract(info, extract_to), streaming the member through ZIP_COPY_CHUNK-sized copies.
+
+    Stored (uncompressed) members, the usual case for CBZ pages, are copied with os.sendfile on Linux.
+    """
+    if info.is_dir() or os.name == 'nt':  # zipfile also sanitises Windows-only characters; leave that to it
+        return zip_ref.extract(info, extract_to)
+    target = zip_member_target(info, extract_to)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as dst:
+        if not sendfile_stored_member(zip_ref, info, dst):
+            with zip_ref.open(info) as src:
+                shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK)
+    return target
+
+def extract_zip(archive_path, extract_to, workers=None):
+    """Extract a ZIP/CBZ with several threads, each reading through its own ZipFile handle."""
+    workers = workers or os.cpu_count() or 1
+    with open_zip(archive_path) as zip_ref:
+        infos = zip_ref.infolist()
+    
+    def extract_slice(members):
+        with open_zip(archive_path) as zip_ref:
+            for info in members:
+                extract_member(zip_ref, info, extract_to)
+    
+    # makedirs(exist_ok=True) in extract_member lets the threads create folders concurrently
+    pending = [info for info in infos if not info.is_dir()]
+    for info in infos:
+        if info.is_dir():
+            os.makedirs(zip_member_target(info, extract_to), exist_ok=True)
+    
+    slices = [pending[i::workers] for i in range(workers) if pending[i::workers]]
+    with ThreadPoolExecutor(max_workers=max(1, len(slices))) as pool:
+        list(pool.map(extract_slice, slices))
+
+def extract_tar(archive_path, extract_to):
+    """Extract a tar archive with any compression tarfile understands."""
+    with tarfile.open(archive_path, 'r:*') as tar_ref:
+        if hasattr(tarfile, 'data_filter'):
+            # Rejects absolute paths, links outside extract_to, device files, ...
+            tar_ref.extractall(extract_to, filter='data')
         else:
-            print(f"🔍 File detection: {output}")
-            return None
-            
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("⚠️  File type detection not available")
+            tar_ref.extractall(extract_to)
+
+def flat_zip_images(archive_path):
+    """Image members of a ZIP whose pages all sit in one folder (no chapters), else None."""
+    try:
+        with open_zip(archive_path) as zip_ref:
+            infos = [info for info in zip_ref.infolist() if not info.is_dir()]
+    except (OSError, zipfile.BadZipFile):
         return None
+    images = sorted((info for info in infos if os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS),
+                    key=lambda info: info.filename)
+    if not images or len({os.path.dirname(info.filename) for info in images}) != 1:
+        return None
+    return images
 
 def extract_archive(archive_path, extract_to):
     """Extract archive with file type detection."""
@@ -74,7 +286,7 @@ def extract_archive(archive_path, extract_to):
     detected_type = detect_file_type(archive_path)
     suffix = archive_path.suffix.lower()
     
-    print(f"🔍 File: {archive_path.name} (ext: {suffix}, detected: {detected_type})")
+    log.info(f"🔍 File: {archive_path.name} (ext: {suffix}, detected: {detected_type})")
     
     # Use detected type if available, otherwise fall back to extension
     if detected_type:
@@ -85,98 +297,115 @@ def extract_archive(archive_path, extract_to):
         archive_type = 'rar'
     elif suffix in ['.gz', '.gzip']:
         archive_type = 'gzip'
+    elif suffix in ['.7z']:
+        archive_type = '7z'
+    elif suffix in ['.tar', '.tgz', '.tbz2', '.txz', '.bz2', '.xz']:
+        archive_type = 'tar'
     else:
-        print(f"❌ Unsupported format: {suffix}")
+        log.error(f"❌ Unsupported format: {suffix}")
         return False
     
     if archive_type == 'zip':
         try:
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_to)
-            print(f"✅ Extracted {archive_path.name}")
+            extract_zip(archive_path, extract_to)
+            log.info(f"✅ Extracted {archive_path.name}")
             return True
         except Exception as e:
-            print(f"❌ Failed to extract ZIP: {e}")
+            log.error(f"❌ Failed to extract ZIP: {e}")
             if "not a zip file" in str(e):
-                print(f"⚠️  File is not actually a ZIP archive despite .cbz extension!")
+                log.warning(f"⚠️  File is not actually a ZIP archive despite .cbz extension!")
             return False
     
     elif archive_type == 'gzip':
         # Handle gzip compressed files (likely .tar.gz renamed to .cbz)
         try:
             # Try to extract as tar.gz first
-            cmd = ['tar', '-xzf', str(archive_path), '-C', str(extract_to)]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted gzip/tar.gz {archive_path.name}")
+            extract_tar(archive_path, extract_to)
+            log.info(f"✅ Extracted gzip/tar.gz {archive_path.name}")
             return True
-        except subprocess.CalledProcessError:
+        except (tarfile.TarError, OSError):
             # If tar.gz fails, try just gzip decompression
             try:
                 output_file = extract_to / archive_path.stem
-                cmd = ['gunzip', '-c', str(archive_path)]
-                with open(output_file, 'wb') as f:
-                    subprocess.run(cmd, stdout=f, check=True)
-                print(f"✅ Decompressed gzip {archive_path.name}")
+                with gzip.open(archive_path, 'rb') as src, open(output_file, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                log.info(f"✅ Decompressed gzip {archive_path.name}")
                 return True
             except Exception as e:
-                print(f"❌ Failed to extract gzip: {e}")
-                print(f"⚠️  File appears to be gzip but extraction failed")
+                log.error(f"❌ Failed to extract gzip: {e}")
+                log.warning(f"⚠️  File appears to be gzip but extraction failed")
                 return False
     
-    elif suffix in ['.rar']:
+    elif archive_type == 'rar':
+        if rarfile is not None:
+            try:
+                with rarfile.RarFile(archive_path) as rar_ref:
+                    rar_ref.extractall(extract_to)
+                log.info(f"✅ Extracted RAR {archive_path.name} to {extract_to}")
+                return True
+            except Exception as e:
+                log.warning(f"⚠️  rarfile could not extract {archive_path.name} ({e}), trying unrar")
         # Extract RAR files using unrar
         try:
             cmd = ['unrar', 'x', str(archive_path), str(extract_to)]
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted RAR {archive_path.name} to {extract_to}")
+            log.info(f"✅ Extracted RAR {archive_path.name} to {extract_to}")
             return True
         except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to extract RAR {archive_path}: {e}")
-            print(f"   Error output: {e.stderr}")
+            log.error(f"❌ Failed to extract RAR {archive_path}: {e}")
+            log.error(f"   Error output: {e.stderr}")
             return False
         except FileNotFoundError:
-            print(f"❌ 'unrar' command not found. Please install unrar:")
-            print(f"   Ubuntu/Debian: sudo apt install unrar")
-            print(f"   Arch: sudo pacman -S unrar")
+            log.error(f"❌ 'unrar' command not found. Please install unrar:")
+            log.error(f"   Ubuntu/Debian: sudo apt install unrar")
+            log.error(f"   Arch: sudo pacman -S unrar")
             return False
     
-    elif suffix in ['.7z']:
+    elif archive_type == '7z':
+        if py7zr is not None:
+            try:
+                with py7zr.SevenZipFile(archive_path, 'r') as sz_ref:
+                    sz_ref.extractall(path=extract_to)
+                log.info(f"✅ Extracted 7Z {archive_path.name} to {extract_to}")
+                return True
+            except Exception as e:
+                log.warning(f"⚠️  py7zr could not extract {archive_path.name} ({e}), trying 7z")
         # Extract 7Z files using 7z
         try:
             cmd = ['7z', 'x', str(archive_path), f'-o{extract_to}', '-y']
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted 7Z {archive_path.name} to {extract_to}")
+            log.info(f"✅ Extracted 7Z {archive_path.name} to {extract_to}")
             return True
         except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to extract 7Z {archive_path}: {e}")
-            print(f"   Error output: {e.stderr}")
+            log.error(f"❌ Failed to extract 7Z {archive_path}: {e}")
+            log.error(f"   Error output: {e.stderr}")
             return False
         except FileNotFoundError:
-            print(f"❌ '7z' command not found. Please install p7zip:")
-            print(f"   Ubuntu/Debian: sudo apt install p7zip-full")
-            print(f"   Arch: sudo pacman -S p7zip")
+            log.error(f"❌ '7z' command not found. Please install p7zip:")
+            log.error(f"   Ubuntu/Debian: sudo apt install p7zip-full")
+            log.error(f"   Arch: sudo pacman -S p7zip")
             return False
     
-    elif suffix in ['.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz']:
-        # Extract TAR files using tar
+    elif archive_type == 'tar':
+        # Extract TAR files (plain, gz, bz2, xz) with tarfile
         try:
-            cmd = ['tar', '-xf', str(archive_path), '-C', str(extract_to)]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"✅ Extracted TAR {archive_path.name} to {extract_to}")
+            extract_tar(archive_path, extract_to)
+            log.info(f"✅ Extracted TAR {archive_path.name} to {extract_to}")
             return True
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to extract TAR {archive_path}: {e}")
-            print(f"   Error output: {e.stderr}")
+        except (tarfile.TarError, OSError) as e:
+            log.error(f"❌ Failed to extract TAR {archive_path}: {e}")
             return False
     
     else:
-        print(f"❌ Unsupported archive format: {suffix}")
-        print(f"   Supported formats: .cbz, .zip, .rar, .7z, .tar, .tar.gz, .tgz, .tar.bz2, .tbz2, .tar.xz, .txz")
+        log.error(f"❌ Unsupported archive format: {suffix}")
+        log.error(f"   Supported formats: .cbz, .zip, .rar, .7z, .tar, .tar.gz, .tgz, .tar.bz2, .tbz2, .tar.xz, .txz")
         return False
 
 def is_archive(file_path):
     """Check if file is a supported archive."""
-    return file_path.suffix.lower() in ['.cbz', '.zip', '.rar', '.7z', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz']
+    # Path.suffix of "x.tar.gz" is ".gz", so also try the last two suffixes
+    return (file_path.suffix.lower() in ARCHIVE_EXTENSIONS
+            or ''.join(file_path.suffixes[-2:]).lower() in ARCHIVE_EXTENSIONS)
 
 def process_image_with_magi(image_path, output_dir):
     """Process a single image with magi.py to generate panel data."""
@@ -184,52 +413,192 @@ def process_image_with_magi(image_path, output_dir):
     output_json = output_dir / f"{image_name}_panels.json"
     
     # Build magi.py command with -i flag
-    script_dir = Path(__file__).parent
-    magi_script = script_dir / "magi.py"
+    # Each image writes its own output file, so several can run at once
+    cmd = ['python3', str(MAGI_SCRIPT), '-i', str(image_path.absolute()), '-o', str(output_json.absolute())]
     
-    # Change to script directory and run detection
-    cmd = ['python3', str(magi_script), '-i', str(image_path.absolute())]
-    
-    print(f"   Processing: {image_path.name}")
+    log.info(f"   Processing: {image_path.name}")
     
     try:
-        # Change to script directory for execution
-        original_cwd = os.getcwd()
-        os.chdir(script_dir)
-        
-        # Run magi.py with -i flag
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        # Run magi.py from the script directory without changing our own cwd
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120, cwd=SCRIPT_DIR)
         
         if result.returncode == 0:
-            # Check if panels.json was created
-            panels_file = script_dir / "panels.json"
-            if panels_file.exists():
-                # Move and rename the output file
-                shutil.move(str(panels_file), str(output_json))
-                print(f"   ✅ Success: {output_json.name}")
+            if output_json.exists():
+                log.info(f"   ✅ Success: {output_json.name}")
                 return True, output_json
             else:
-                print(f"   ⚠️  No output file created")
-                print(f"   Output: {result.stdout}")
+                log.warning(f"   ⚠️  No output file created")
+                log.warning(f"   Output: {result.stdout}")
                 return False, None
         else:
-            print(f"   ❌ Failed:")
-            print(f"      Return code: {result.returncode}")
+            log.error(f"   ❌ Failed:")
+            log.error(f"      Return code: {result.returncode}")
             if result.stderr:
                 error_msg = result.stderr.strip()
                 if len(error_msg) > 200:
                     error_msg = error_msg[:200] + "..."
-                print(f"      Error: {error_msg}")
+                log.error(f"      Error: {error_msg}")
             return False, None
             
     except subprocess.TimeoutExpired:
-        print(f"   ❌ Timeout processing {image_path.name}")
+        log.error(f"   ❌ Timeout processing {image_path.name}")
         return False, None
     except Exception as e:
-        print(f"   ❌ Exception processing {image_path.name}: {e}")
+        log.error(f"   ❌ Exception processing {image_path.name}: {e}")
         return False, None
-    finally:
-        os.chdir(original_cwd)
+
+def process_image_batch_with_magi(image_files, output_file):
+    """Process several images with one magi.py --batch call, so the model is loaded once.
+
+    All of the batch's results go to the single JSON-lines file output_file.
+    """
+    cmd = ['python3', str(MAGI_SCRIPT), '--batch', '--jsonl', *MAGI_OPTIONS, '-o', str(output_file.absolute())]
+    cmd += [str(image_file.absolute()) for image_file in image_files]
+    
+    log.info(f"   Processing batch: {image_files[0].name} … {image_files[-1].name} ({len(image_files)} images)")
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120 * len(image_files), cwd=SCRIPT_DIR)
+        
+        if result.returncode != 0:
+            log.error(f"   ❌ Batch failed:")
+            log.error(f"      Return code: {result.returncode}")
+            if result.stderr:
+                error_msg = result.stderr.strip()
+                if len(error_msg) > 200:
+                    error_msg = error_msg[:200] + "..."
+                log.error(f"      Error: {error_msg}")
+            
+    except subprocess.TimeoutExpired:
+        log.error(f"   ❌ Timeout processing batch starting at {image_files[0].name}")
+    except Exception as e:
+        log.error(f"   ❌ Exception processing batch starting at {image_files[0].name}: {e}")
+
+def magi_daemon_request(request, timeout=None):
+    """Send one request to the magi.py daemon on MAGI_SOCKET. Returns the reply, or None if none is listening."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(MAGI_SOCKET)
+            conn.sendall(json.dumps(request).encode('utf-8') + b"\n")
+            with conn.makefile('rb') as reader:
+                line = reader.readline()
+        return json.loads(line) if line else {}
+    except OSError:
+        return None
+
+def start_magi_daemon(startup_timeout=600):
+    """Start `magi.py --serve` so every batch of this run reuses one loaded model.
+
+    magi.py --batch already talks to a daemon when one is listening. Returns the daemon process,
+    or None when one was already running or it could not be started.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        log.warning("⚠️  --daemon needs Unix domain sockets, loading the model per batch instead")
+        return None
+    if magi_daemon_request({"command": "ping"}, timeout=5) is not None:
+        log.info("♻️  Reusing the running MAGI daemon")
+        return None
+    
+    log.info("⏳ Starting MAGI daemon (model loads once for the whole run)...")
+    daemon = subprocess.Popen(['python3', str(MAGI_SCRIPT), '--serve', *MAGI_OPTIONS], cwd=SCRIPT_DIR,
+                              stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if daemon.poll() is not None:
+            log.warning(f"⚠️  MAGI daemon exited with code {daemon.returncode}, loading the model per batch instead")
+            return None
+        if magi_daemon_request({"command": "ping"}, timeout=5) is not None:
+            log.info("✅ MAGI daemon ready")
+            return daemon
+        time.sleep(0.5)
+    log.warning("⚠️  MAGI daemon did not come up in time, loading the model per batch instead")
+    daemon.kill()
+    return None
+
+def stop_magi_daemon(daemon):
+    """Shut down a daemon started by start_magi_daemon."""
+    if daemon is None:
+        return
+    magi_daemon_request({"command": "shutdown"}, timeout=30)
+    try:
+        daemon.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        daemon.kill()
+
+def split_into_batches(image_files, workers):
+    """Split images into one batch per worker, capped by image count and command-line length."""
+    target = min(MAX_BATCH_IMAGES, -(-len(image_files) // max(1, workers)))
+    batches, current, chars = [], [], 0
+    for image_file in image_files:
+        length = len(str(image_file.absolute())) + 1
+        if current and (len(current) >= target or chars + length > MAX_BATCH_ARGV_CHARS):
+            batches.append(current)
+            current, chars = [], 0
+        current.append(image_file)
+        chars += length
+    if current:
+        batches.append(current)
+    return batches
+
+def batch_output_files(batches, output_dir):
+    """One JSON-lines result file per batch in output_dir."""
+    return [output_dir / f"batch_{index:03d}.jsonl" for index in range(len(batches))]
+
+def process_images_with_magi(image_files, output_dir, workers=DEFAULT_WORKERS):
+    """Run magi.py over all images in a few batches, concurrently.
+
+    Returns the detected pages as (image_file, panels) in image order, and the batch files written to output_dir.
+    """
+    batches = split_into_batches(image_files, workers)
+    batch_files = batch_output_files(batches, output_dir)
+    with ThreadPoolExecutor(max_workers=max(1, len(batches))) as pool:
+        list(pool.map(process_image_batch_with_magi, batches, batch_files))
+    return collect_magi_results(image_files, batch_files), batch_files
+
+def stream_zip_to_magi(archive_path, image_infos, extract_to, output_dir, workers=DEFAULT_WORKERS):
+    """Extract a flat ZIP batch by batch, starting magi.py on each batch while the next one is extracted.
+
+    Pages are still written to extract_to, but MAGI reads them while they are hot in the page cache.
+    Returns the extracted image files, the detected pages and the batch files (see process_images_with_magi).
+    """
+    planned = [extract_to / info.filename for info in image_infos]
+    batches = split_into_batches(planned, workers)
+    batch_files = batch_output_files(batches, output_dir)
+    image_files = []
+    with open_zip(archive_path) as zip_ref, ThreadPoolExecutor(max_workers=max(1, len(batches))) as pool:
+        pending = iter(image_infos)
+        for batch, batch_file in zip(batches, batch_files):
+            extracted = [Path(extract_member(zip_ref, next(pending), extract_to)) for _ in batch]
+            image_files.extend(extracted)
+            pool.submit(process_image_batch_with_magi, extracted, batch_file)
+        # Everything else (ComicInfo.xml, ...) once the pages are on their way
+        image_names = {info.filename for info in image_infos}
+        for info in zip_ref.infolist():
+            if info.filename not in image_names:
+                extract_member(zip_ref, info, extract_to)
+    return image_files, collect_magi_results(image_files, batch_files), batch_files
+
+def collect_magi_results(image_files, batch_files):
+    """Read the batch files back into (image_file, panels) pairs, in image order."""
+    panels_by_input = {}
+    for batch_file in batch_files:
+        try:
+            for record in iter_jsonl(batch_file):
+                panels_by_input[record["input"]] = record["panels"]
+        except FileNotFoundError:
+            pass  # the whole batch failed, reported below per image
+    pages = []
+    for image_file in image_files:
+        panels = panels_by_input.get(os.path.abspath(image_file))
+        if panels is not None:
+            log.info(f"   ✅ Success: {image_file.name}")
+            pages.append((image_file, panels))
+        else:
+            log.warning(f"   ⚠️  Failed to process {image_file.name}")
+    return pages
 
 def try_kumiko_with_flags(image_path, output_file, flags):
     """Try running Kumiko with specific flags."""
@@ -238,207 +607,215 @@ def try_kumiko_with_flags(image_path, output_file, flags):
     # Build Kumiko command with -i for input and -o for output
     cmd = ['python3', 'kumiko', '-i', str(image_path)] + flags + ['-o', str(output_file)]
     
-    print(f"   Trying: {' '.join(cmd)}")
+    log.info(f"   Trying: {' '.join(cmd)}")
     
     try:
-        # Change to Kumiko directory for execution
-        original_cwd = os.getcwd()
-        kumiko_dir = Path(__file__).parent
-        os.chdir(kumiko_dir)
-        
-        # Run Kumiko
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        # Run Kumiko from its directory without changing our own cwd
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120, cwd=SCRIPT_DIR)
         
         if result.returncode == 0:
             if output_file.exists():
-                print(f"   ✅ Success with flags: {' '.join(flags)}")
+                log.info(f"   ✅ Success with flags: {' '.join(flags)}")
                 return True, output_file
             else:
-                print(f"   ⚠️  File not created: {output_file}")
-                print(f"   Kumiko output: {result.stdout}")
+                log.warning(f"   ⚠️  File not created: {output_file}")
+                log.warning(f"   Kumiko output: {result.stdout}")
                 return False, None
         else:
-            print(f"   ❌ Failed with flags {' '.join(flags)}:")
-            print(f"      Return code: {result.returncode}")
+            log.error(f"   ❌ Failed with flags {' '.join(flags)}:")
+            log.error(f"      Return code: {result.returncode}")
             if result.stderr:
                 error_msg = result.stderr.strip()
                 if len(error_msg) > 200:
                     error_msg = error_msg[:200] + "..."
-                print(f"      Error: {error_msg}")
+                log.error(f"      Error: {error_msg}")
             return False, None
             
     except subprocess.TimeoutExpired:
-        print(f"   ❌ Timeout with flags {' '.join(flags)}")
+        log.error(f"   ❌ Timeout with flags {' '.join(flags)}")
         return False, None
     except Exception as e:
-        print(f"   ❌ Exception with flags {' '.join(flags)}: {e}")
+        log.error(f"   ❌ Exception with flags {' '.join(flags)}: {e}")
         return False, None
-    finally:
-        os.chdir(original_cwd)
 
-def convert_json_to_html(json_file, html_file):
-    """Convert Kumiko JSON output to HTML format for processing."""
-    import json
-    
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Create a simple HTML structure with the panel data
-        html_content = f"""<!DOCTYPE html>
+PANEL_HTML_TEMPLATE = b"""<!DOCTYPE html>
 <html>
 <head>
     <title>Kumiko Panel Data</title>
 </head>
 <body>
-    <h1>Panel Data for {json_file.stem}</h1>
+    <h1>Panel Data for {{TITLE}}</h1>
     <script>
-        var panelData = {json.dumps(data, indent=2)};
+        var panelData = {{DATA}};
     </script>
 </body>
 </html>"""
+
+def convert_json_to_html(json_file, html_file):
+    """Convert Kumiko JSON output to HTML format for processing."""
+    try:
+        data = load_json(json_file)
+        # Embedded for scripts, not people: no indentation
+        data_json = orjson.dumps(data) if orjson is not None else json.dumps(data, separators=(',', ':')).encode('ascii')
         
-        with open(html_file, 'w', encoding='utf-8') as f:
+        # Create a simple HTML structure with the panel data
+        html_content = (PANEL_HTML_TEMPLATE
+                        .replace(b'{{TITLE}}', json_file.stem.encode('utf-8'))
+                        .replace(b'{{DATA}}', data_json))
+        
+        with open(html_file, 'wb') as f:
             f.write(html_content)
         
-        print(f"   ✅ Converted JSON to HTML: {html_file}")
+        log.info(f"   ✅ Converted JSON to HTML: {html_file}")
         return True, html_file
         
     except Exception as e:
-        print(f"   ❌ JSON to HTML conversion failed: {e}")
+        log.error(f"   ❌ JSON to HTML conversion failed: {e}")
         return False, None
 
-def combine_jsons_to_final_json(json_files, output_json, temp_json_dir, folder_path):
-    """Combine multiple JSON files into a single JSON with page-based structure."""
-    import json
-    
+def subdirectories(directory):
+    """Folders directly inside directory, typed from the scandir entries without a stat() each."""
+    with os.scandir(directory) as entries:
+        return [Path(entry.path) for entry in entries if entry.is_dir()]
+
+def list_images(directory, recursive=False):
+    """Sorted image files in directory (and below it with recursive), typed from scandir entries.
+
+    Like Path.rglob, recursion does not follow symlinked folders.
+    """
+    images, pending = [], [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if recursive and not entry.is_symlink():
+                        pending.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                    images.append(Path(entry.path))
+    images.sort()
+    return images
+
+def dir_has_images(directory):
+    """Check whether directory directly contains an image, stopping at the first one."""
+    try:
+        with os.scandir(directory) as entries:
+            return any(entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+                       for entry in entries)
+    except OSError:
+        return False
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic); C4/C8/CC are not frames
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def read_header_size(path):
+    """(width, height) of a PNG or JPEG from its header alone, or None for anything else."""
+    with open(path, 'rb') as f:
+        head = f.read(24)
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if not head.startswith(b'\xff\xd8'):
+            return None
+        # Walk the JPEG segments up to the first SOF
+        f.seek(2)
+        while True:
+            byte = f.read(1)
+            if byte != b'\xff':
+                return None
+            marker = f.read(1)
+            while marker == b'\xff':  # fill bytes
+                marker = f.read(1)
+            if not marker:
+                return None
+            marker = marker[0]
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # no length field
+                continue
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            if marker in JPEG_SOF_MARKERS:
+                payload = f.read(5)
+                if len(payload) < 5:
+                    return None
+                height, width = struct.unpack('>HH', payload[1:5])
+                return width, height
+            f.seek(struct.unpack('>H', length)[0] - 2, 1)
+
+def image_size(path):
+    """(width, height) of an image, from the PNG/JPEG header when possible, otherwise via PIL."""
+    size = read_header_size(path)
+    if size is not None:
+        return size
+    if Image is None:
+        raise RuntimeError("Pillow is not installed, cannot read this image format")
+    with Image.open(path) as img:
+        return img.size
+
+def combine_pages_to_final_json(pages, output_json):
+    """Combine the (image_file, panels) results of a folder into a single JSON with page-based structure.
+
+    Returns (success, total_pages).
+    """
     pages_data = []
     reading_direction = "rtl"  # Default to RTL for manga
     
-    print(f"🔄 Combining {len(json_files)} JSON files to final JSON...")
-    
-    # Check which JSON files actually exist
-    existing_json_files = []
-    for json_file in json_files:
-        if json_file.exists():
-            existing_json_files.append(json_file)
-            print(f"   Found: {json_file.name}")
-        else:
-            print(f"   ❌ Missing: {json_file}")
+    log.info(f"🔄 Combining {len(pages)} pages to final JSON...")
     
-    if not existing_json_files:
-        print(f"❌ No JSON files found to process")
-        return False
+    if not pages:
+        log.error(f"❌ No page results to process")
+        return False, 0
     
-    # Sort JSON files by name to ensure correct page order
-    existing_json_files.sort(key=lambda x: x.name)
+    # Same page order as the per-page <stem>_panels.json files used to give
+    pages = sorted(pages, key=lambda page: f"{page[0].stem}_panels.json")
     
-    for page_num, json_file in enumerate(existing_json_files, 1):
-        print(f"   Processing page {page_num}: {json_file.name}")
+    for page_num, (img_path, panels) in enumerate(pages, 1):
+        log.info(f"   Processing page {page_num}: {img_path.name}")
         
+        actual_image_name = img_path.name
+        actual_img_width, actual_img_height = 800, 1200  # fallback
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            actual_img_width, actual_img_height = image_size(img_path)
+            log.info(f"     Found actual image dimensions: {actual_img_width}x{actual_img_height} from {img_path.name}")
+        except Exception as e:
+            log.info(f"     Could not read image {img_path}: {e}")
+        
+        try:
+            # MAGI format: [x1, y1, x2, y2] absolute coordinates
+            raw_boxes = [p for p in panels if isinstance(p, list) and len(p) == 4]
             
             # Convert MAGI panels format to page format
             page_panels = []
-            if 'panels' in data:
-                # Get actual image dimensions for proper normalization
-                from PIL import Image
-                
-                # Try to find the actual image file to get dimensions
-                actual_img_width, actual_img_height = 800, 1200  # fallback
-                
-                # Look for the image in the temp directory or original folder with better format support
-                image_extensions = ['.jpg', '.jpeg', '.png']
+            # MAGI resizes images to max 800px before processing
+            # Check if image was resized by MAGI and adjust coordinates accordingly
+            magi_max_size = 800
+            if max(actual_img_width, actual_img_height) > magi_max_size:
+                # Calculate the scale factor MAGI used
+                scale_factor = magi_max_size / max(actual_img_width, actual_img_height)
+                magi_img_width = int(actual_img_width * scale_factor)
+                magi_img_height = int(actual_img_height * scale_factor)
+                log.info(f"     MAGI resized image to: {magi_img_width}x{magi_img_height} (scale: {scale_factor:.3f})")
                 
-                for ext in image_extensions:
-                    image_name = json_file.stem.replace('_panels', '') + ext
-                    image_name_upper = json_file.stem.replace('_panels', '') + ext.upper()
-                    
-                    possible_image_paths = [
-                        temp_json_dir / image_name,      # in temp dir
-                        folder_path / image_name,        # in original folder
-                        temp_json_dir / image_name_upper, # uppercase in temp dir
-                        folder_path / image_name_upper,   # uppercase in original folder
-                    ]
-                    
-                    for img_path in possible_image_paths:
-                        if img_path.exists():
-                            try:
-                                with Image.open(img_path) as img:
-                                    actual_img_width, actual_img_height = img.size
-                                    print(f"     Found actual image dimensions: {actual_img_width}x{actual_img_height} from {img_path.name}")
-                                    break
-                            except Exception as e:
-                                print(f"     Could not read image {img_path}: {e}")
-                    else:
-                        continue
-                    break
-                
-                # MAGI resizes images to max 800px before processing
-                # Check if image was resized by MAGI and adjust coordinates accordingly
-                magi_max_size = 800
-                if max(actual_img_width, actual_img_height) > magi_max_size:
-                    # Calculate the scale factor MAGI used
-                    scale_factor = magi_max_size / max(actual_img_width, actual_img_height)
-                    magi_img_width = int(actual_img_width * scale_factor)
-                    magi_img_height = int(actual_img_height * scale_factor)
-                    print(f"     MAGI resized image to: {magi_img_width}x{magi_img_height} (scale: {scale_factor:.3f})")
-                    
-                    # Use MAGI's resized dimensions for coordinate normalization
-                    coord_img_width = magi_img_width
-                    coord_img_height = magi_img_height
-                else:
-                    # Image wasn't resized, use original dimensions
-                    coord_img_width = actual_img_width
-                    coord_img_height = actual_img_height
-                    print(f"     Image not resized, using original dimensions")
-                
-                for panel_data in data['panels']:
-                    if isinstance(panel_data, list) and len(panel_data) == 4:
-                        # MAGI format: [x1, y1, x2, y2] absolute coordinates
-                        x1, y1, x2, y2 = panel_data
-                        w = x2 - x1
-                        h = y2 - y1
-                        
-                        # Normalize to 0-1 range using MAGI's processed image dimensions
-                        normalized_x = x1 / coord_img_width
-                        normalized_y = y1 / coord_img_height
-                        normalized_w = w / coord_img_width
-                        normalized_h = h / coord_img_height
-                        
-                        panel = {
-                            "x": round(normalized_x, 3),
-                            "y": round(normalized_y, 3),
-                            "w": round(normalized_w, 3),
-                            "h": round(normalized_h, 3)
-                        }
-                        page_panels.append(panel)
-                        print(f"     Panel: [{x1},{y1},{x2},{y2}] -> normalized: x={panel['x']}, y={panel['y']}, w={panel['w']}, h={panel['h']}")
+                # Use MAGI's resized dimensions for coordinate normalization
+                coord_img_width = magi_img_width
+                coord_img_height = magi_img_height
+            else:
+                # Image wasn't resized, use original dimensions
+                coord_img_width = actual_img_width
+                coord_img_height = actual_img_height
+                log.info(f"     Image not resized, using original dimensions")
             
-            # Create page data structure
-            # Try to find the actual image file to determine the correct extension
-            actual_image_name = json_file.stem.replace('_panels', '') + ".jpg"  # default
-            for ext in ['.jpg', '.jpeg', '.png']:
-                image_name = json_file.stem.replace('_panels', '') + ext
-                image_name_upper = json_file.stem.replace('_panels', '') + ext.upper()
-                
-                possible_image_paths = [
-                    temp_json_dir / image_name,      # in temp dir
-                    folder_path / image_name,        # in original folder
-                    temp_json_dir / image_name_upper, # uppercase in temp dir
-                    folder_path / image_name_upper,   # uppercase in original folder
-                ]
-                
-                for img_path in possible_image_paths:
-                    if img_path.exists():
-                        actual_image_name = img_path.name
-                        break
-                else:
-                    continue
-                break
+            if raw_boxes:
+                boxes = np.asarray(raw_boxes, dtype=np.float64)
+                # Normalize to 0-1 range using MAGI's processed image dimensions, all panels at once
+                scale = np.array([coord_img_width, coord_img_height], dtype=np.float64)
+                normalized = np.hstack([boxes[:, :2] / scale, (boxes[:, 2:] - boxes[:, :2]) / scale])
+                # Python's round() rather than np.round so halfway cases match previous output
+                page_panels = [{key: round(value, 3) for key, value in zip("xywh", row)} for row in normalized.tolist()]
+                if log.isEnabledFor(logging.DEBUG):
+                    for (x1, y1, x2, y2), panel in zip(raw_boxes, page_panels):
+                        log.debug("     Panel: [%s,%s,%s,%s] -> normalized: x=%s, y=%s, w=%s, h=%s",
+                                  x1, y1, x2, y2, panel['x'], panel['y'], panel['w'], panel['h'])
             
+            # Create page data structure
             page_data = {
                 "page": page_num,
                 "image": actual_image_name,
@@ -446,32 +823,11 @@ def combine_jsons_to_final_json(json_files, output_json, temp_json_dir, folder_p
             }
             pages_data.append(page_data)
             
-            print(f"     Added {len(page_panels)} panels for page {page_num}")
+            log.info(f"     Added {len(page_panels)} panels for page {page_num}")
         
         except Exception as e:
-            print(f"   ❌ Error processing {json_file}: {e}")
+            log.error(f"   ❌ Error processing {img_path.name}: {e}")
             # Create empty page data even on error
-            # Try to find the actual image file to determine the correct extension
-            actual_image_name = json_file.stem.replace('_panels', '') + ".jpg"  # default
-            for ext in ['.jpg', '.jpeg', '.png']:
-                image_name = json_file.stem.replace('_panels', '') + ext
-                image_name_upper = json_file.stem.replace('_panels', '') + ext.upper()
-                
-                possible_image_paths = [
-                    temp_json_dir / image_name,      # in temp dir
-                    folder_path / image_name,        # in original folder
-                    temp_json_dir / image_name_upper, # uppercase in temp dir
-                    folder_path / image_name_upper,   # uppercase in original folder
-                ]
-                
-                for img_path in possible_image_paths:
-                    if img_path.exists():
-                        actual_image_name = img_path.name
-                        break
-                else:
-                    continue
-                break
-            
             page_data = {
                 "page": page_num,
                 "image": actual_image_name,
@@ -481,12 +837,12 @@ def combine_jsons_to_final_json(json_files, output_json, temp_json_dir, folder_p
             continue
     
     if not pages_data:
-        print(f"❌ No page data created")
-        return False
+        log.error(f"❌ No page data created")
+        return False, 0
     
     # Count total panels
     total_panels = sum(len(page_data["panels"]) for page_data in pages_data)
-    print(f"📊 Total pages: {len(pages_data)}, Total panels: {total_panels}")
+    log.info(f"📊 Total pages: {len(pages_data)}, Total panels: {total_panels}")
     
     # Create final JSON structure with pages array
     json_data = {
@@ -497,15 +853,14 @@ def combine_jsons_to_final_json(json_files, output_json, temp_json_dir, folder_p
     
     # Write JSON output
     try:
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2, ensure_ascii=False)
+        dump_json(json_data, output_json)
         
-        print(f"✅ Combined {total_panels} panels from {len(pages_data)} pages to {output_json}")
-        return True
+        log.info(f"✅ Combined {total_panels} panels from {len(pages_data)} pages to {output_json}")
+        return True, len(pages_data)
         
     except Exception as e:
-        print(f"❌ Error writing JSON: {e}")
-        return False
+        log.error(f"❌ Error writing JSON: {e}")
+        return False, 0
 
 def add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h):
     """Add a normalized panel to a specific page's panel list."""
@@ -529,7 +884,7 @@ def add_normalized_panel_to_page(page_panels, x, y, w, h, img_w, img_h):
     }
     
     page_panels.append(panel)
-    print(f"       Added panel: x={panel['x']}, y={panel['y']}, w={panel['w']}, h={panel['h']}")
+    log.debug("       Added panel: x=%s, y=%s, w=%s, h=%s", panel['x'], panel['y'], panel['w'], panel['h'])
     return 1
 
 def add_normalized_panel(all_panels, x, y, w, h, img_w, img_h):
@@ -554,275 +909,278 @@ def add_normalized_panel(all_panels, x, y, w, h, img_w, img_h):
     }
     
     all_panels.append(panel)
-    print(f"       Added panel: x={panel['x']}, y={panel['y']}, w={panel['w']}, h={panel['h']}")
+    log.debug("       Added panel: x=%s, y=%s, w=%s, h=%s", panel['x'], panel['y'], panel['w'], panel['h'])
     return 1
 
-def process_with_magi(folder_path, output_dir):
-    """Process a folder with magi.py by processing each image separately."""
+def process_with_magi(folder_path, output_dir, workers=DEFAULT_WORKERS, archive_path=None, archive_images=None):
+    """Process a folder with magi.py by processing each image separately.
+
+    With archive_path/archive_images (see flat_zip_images), the pages are extracted into
+    folder_path here, overlapping extraction with detection.
+    """
     folder_name = folder_path.name
     output_json = output_dir / f"{folder_name}.json"
     temp_json_dir = output_dir / f"{folder_name}_temp"
     temp_json_dir.mkdir(exist_ok=True)
     
-    print(f"🔄 Processing folder {folder_name} with individual image processing...")
+    log.info(f"🔄 Processing folder {folder_name} with individual image processing...")
     
-    # Get all image files in the folder and subdirectories
-    image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']
-    image_files = []
-    
-    for ext in image_extensions:
-        # Search in current folder and all subdirectories
-        image_files.extend(folder_path.rglob(f"*{ext}"))
-        image_files.extend(folder_path.rglob(f"*{ext.upper()}"))
+    if archive_images:
+        try:
+            image_files, pages, batch_files = stream_zip_to_magi(archive_path, archive_images, folder_path, temp_json_dir, workers)
+        except Exception as e:
+            log.error(f"❌ Failed to extract ZIP: {e}")
+            return False
+        log.info(f"✅ Extracted {archive_path.name}")
+        return finish_magi_folder(image_files, pages, batch_files, output_json, temp_json_dir)
     
-    # Sort files for consistent processing
-    image_files.sort()
+    # Get all image files in the folder and subdirectories, in a single sorted walk
+    image_files = list_images(folder_path, recursive=True)
     
     if not image_files:
-        print(f"❌ No image files found in {folder_path} or its subdirectories")
-        print(f"   Contents of {folder_path}:")
+        log.error(f"❌ No image files found in {folder_path} or its subdirectories")
+        log.info(f"   Contents of {folder_path}:")
         try:
             for item in folder_path.rglob("*"):
                 if item.is_file():
-                    print(f"     - {item.relative_to(folder_path)}")
+                    log.info(f"     - {item.relative_to(folder_path)}")
                 elif item.is_dir():
-                    print(f"     📁 {item.relative_to(folder_path)}/")
+                    log.info(f"     📁 {item.relative_to(folder_path)}/")
         except Exception as e:
-            print(f"     Could not list contents: {e}")
+            log.info(f"     Could not list contents: {e}")
         return False
     
-    print(f"   Found {len(image_files)} image files in {folder_path} and subdirectories")
+    log.info(f"   Found {len(image_files)} image files in {folder_path} and subdirectories")
     
-    # Process each image separately
-    json_files = []
-    successful_images = 0
-    
-    for image_file in image_files:
-        success, json_file = process_image_with_magi(image_file, temp_json_dir)
-        if success and json_file and json_file.exists():
-            json_files.append(json_file)
-            successful_images += 1
-        else:
-            print(f"   ⚠️  Failed to process {image_file.name}")
+    # Process each image separately, several at a time
+    pages, batch_files = process_images_with_magi(image_files, temp_json_dir, workers)
+    return finish_magi_folder(image_files, pages, batch_files, output_json, temp_json_dir)
+
+def finish_magi_folder(image_files, pages, batch_files, output_json, temp_json_dir):
+    """Combine a folder's page results into output_json and remove the temp directory."""
+    successful_images = len(pages)
     
-    print(f"   Successfully processed {successful_images}/{len(image_files)} images")
+    log.info(f"   Successfully processed {successful_images}/{len(image_files)} images")
     
-    if not json_files:
-        print(f"❌ No JSON files were generated")
+    if not pages:
+        log.error(f"❌ No JSON files were generated")
         return False
     
-    # List all JSON files that were actually created
-    print(f"   JSON files created:")
-    for json_file in json_files:
-        print(f"     - {json_file.name}")
-    
-    # Combine all JSON files into single JSON
-    success = combine_jsons_to_final_json(json_files, output_json, temp_json_dir, folder_path)
+    # Combine all page results into single JSON
+    success, _ = combine_pages_to_final_json(pages, output_json)
     
     # Clean up temporary JSON files
     try:
-        import shutil
-        shutil.rmtree(temp_json_dir)
-        print(f"🧹 Cleaned up temporary files")
+        remove_temp_dir(temp_json_dir, batch_files)
+        log.info(f"🧹 Cleaned up temporary files")
     except Exception as e:
-        print(f"⚠️  Could not clean up temp files: {e}")
+        log.warning(f"⚠️  Could not clean up temp files: {e}")
     
     return success
 
+def remove_temp_dir(temp_json_dir, json_files):
+    """Delete the JSON files we wrote, then the now-empty temp_json_dir (rmtree only if something else is left)."""
+    for json_file in json_files:
+        try:
+            json_file.unlink()
+        except OSError:
+            pass
+    try:
+        temp_json_dir.rmdir()
+    except OSError:
+        shutil.rmtree(temp_json_dir)
+
+# Chapter temp directories are removed on a background thread, so the next chapter doesn't wait on the unlinks
+cleanup_queue = queue.Queue()
+
+def cleanup_worker():
+    """Drain cleanup_queue of (temp_json_dir, json_files, label) forever."""
+    while True:
+        temp_json_dir, json_files, label = cleanup_queue.get()
+        try:
+            remove_temp_dir(temp_json_dir, json_files)
+            log.info(f"   🧹 Cleaned up temporary files for {label}")
+        except Exception as e:
+            log.warning(f"   ⚠️  Could not clean up temp files for {label}: {e}")
+        finally:
+            cleanup_queue.task_done()
+
+threading.Thread(target=cleanup_worker, name="cleanup", daemon=True).start()
+
 def is_chapter_based_archive(folder_path):
     """Check if a folder contains chapter directories (KOReader-style structure)."""
     if not folder_path.is_dir():
         return False
     
-    print(f"   🔍 Checking for chapter-based structure in {folder_path}")
+    log.info(f"   🔍 Checking for chapter-based structure in {folder_path}")
     
     # Count subdirectories that contain images
     chapter_dirs = 0
     image_files_in_root = 0
     
     # First, check if there's a nested structure (e.g., 3/3/ch1, 3/3/ch2)
-    nested_dirs = [d for d in folder_path.iterdir() if d.is_dir()]
+    nested_dirs = subdirectories(folder_path)
     
     # If there's only one subdirectory, check inside it for chapters
     if len(nested_dirs) == 1:
         nested_dir = nested_dirs[0]
-        print(f"   📁 Found single nested directory: {nested_dir.name}, checking inside...")
+        log.info(f"   📁 Found single nested directory: {nested_dir.name}, checking inside...")
         folder_path = nested_dir
     
-    for item in folder_path.iterdir():
-        if item.is_dir():
-            # Check if this subdirectory contains images
-            has_images = False
-            image_count = 0
-            for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-                images = list(item.glob(f"*{ext}")) + list(item.glob(f"*{ext.upper()}"))
-                image_count += len(images)
-                if images:
-                    has_images = True
-                    break
-            if has_images:
-                chapter_dirs += 1
-                print(f"   📖 Found chapter directory: {item.name} with {image_count} images")
-        elif item.is_file() and item.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-            image_files_in_root += 1
-    
-    print(f"   📊 Found {chapter_dirs} chapter directories and {image_files_in_root} images in root")
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                # One scandir per subdirectory, stopping at its first image
+                if dir_has_images(entry.path):
+                    chapter_dirs += 1
+                    log.info(f"   📖 Found chapter directory: {entry.name}")
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                image_files_in_root += 1
+    
+    log.info(f"   📊 Found {chapter_dirs} chapter directories and {image_files_in_root} images in root")
     
     # Consider it chapter-based if there are multiple chapter directories
     # Also consider it chapter-based if there's at least 1 chapter directory and few/no images in root
     return chapter_dirs >= 2 or (chapter_dirs >= 1 and image_files_in_root <= 2)
 
-def process_chapter_based_archive(folder_path, output_dir):
+def process_chapter(chapter_dir, chapter_json, workers=DEFAULT_WORKERS):
+    """Run MAGI over one chapter folder and write chapter_json ({folder_name}_{chapter}.json).
+
+    Returns (success, total_pages).
+    """
+    log.info(f"\n📖 Processing chapter: {chapter_dir.name}")
+    
+    # Chapter-specific temp folder next to the chapter output
+    temp_json_dir = chapter_json.with_name(f"{chapter_json.stem}_temp")
+    temp_json_dir.mkdir(exist_ok=True)
+    
+    # Get all image files in this chapter, sorted for consistent processing
+    image_files = list_images(chapter_dir)
+    
+    if not image_files:
+        log.warning(f"   ⚠️  No image files found in {chapter_dir.name}")
+        return False, 0
+    
+    log.info(f"   Found {len(image_files)} image files in {chapter_dir.name}")
+    
+    # Process each image in this chapter, several at a time
+    pages, batch_files = process_images_with_magi(image_files, temp_json_dir, workers)
+    successful_images = len(pages)
+    
+    log.info(f"   Successfully processed {successful_images}/{len(image_files)} images in {chapter_dir.name}")
+    
+    if not pages:
+        log.error(f"   ❌ No JSON files were generated for {chapter_dir.name}")
+        return False, 0
+    
+    # Combine all JSON files into single JSON for this chapter
+    success, total_pages = combine_pages_to_final_json(pages, chapter_json)
+    
+    if success:
+        log.info(f"   ✅ Chapter {chapter_dir.name} completed successfully")
+    
+    # Clean up temporary JSON files in the background
+    cleanup_queue.put((temp_json_dir, batch_files, chapter_dir.name))
+    
+    return success, total_pages
+
+def process_chapter_based_archive(folder_path, output_dir, workers=DEFAULT_WORKERS):
     """Process a CBZ archive with chapter folders for KOReader compatibility."""
     folder_name = folder_path.name
     
-    print(f"🔄 Processing chapter-based archive {folder_name}...")
+    log.info(f"🔄 Processing chapter-based archive {folder_name}...")
     
     # Handle nested structure - check if there's a single nested directory
-    nested_dirs = [d for d in folder_path.iterdir() if d.is_dir()]
+    nested_dirs = subdirectories(folder_path)
     if len(nested_dirs) == 1:
         nested_dir = nested_dirs[0]
         # Check if the nested directory contains chapter directories
-        nested_chapter_dirs = [d for d in nested_dir.iterdir() if d.is_dir()]
-        has_chapters_in_nested = any(
-            any(list(d.glob(f"*{ext}")) or list(d.glob(f"*{ext.upper()}")) 
-                for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'])
-            for d in nested_chapter_dirs
-        )
+        nested_chapter_dirs = subdirectories(nested_dir)
+        has_chapters_in_nested = any(dir_has_images(d) for d in nested_chapter_dirs)
         if has_chapters_in_nested:
-            print(f"   📁 Using nested directory structure: {nested_dir.name}")
+            log.info(f"   📁 Using nested directory structure: {nested_dir.name}")
             folder_path = nested_dir
     
     # Find all chapter directories (subdirectories containing images)
-    chapter_dirs = []
-    for item in folder_path.iterdir():
-        if item.is_dir():
-            # Check if this directory contains image files
-            has_images = False
-            for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-                if list(item.glob(f"*{ext}")) or list(item.glob(f"*{ext.upper()}")):
-                    has_images = True
-                    break
-            if has_images:
-                chapter_dirs.append(item)
+    # Keep subdirectories that contain image files
+    chapter_dirs = [d for d in subdirectories(folder_path) if dir_has_images(d)]
     
     if not chapter_dirs:
-        print(f"❌ No chapter directories with images found in {folder_path}")
+        log.error(f"❌ No chapter directories with images found in {folder_path}")
         return False
     
     # Sort chapter directories for consistent processing
     chapter_dirs.sort(key=lambda x: x.name)
     
-    print(f"   Found {len(chapter_dirs)} chapter directories:")
+    log.info(f"   Found {len(chapter_dirs)} chapter directories:")
     for chapter_dir in chapter_dirs:
-        print(f"     - {chapter_dir.name}/")
-    
-    # Process each chapter separately
-    successful_chapters = 0
-    for chapter_dir in chapter_dirs:
-        print(f"\n📖 Processing chapter: {chapter_dir.name}")
-        
-        # Create chapter-specific output
-        chapter_json = output_dir / f"{folder_name}_{chapter_dir.name}.json"
-        temp_json_dir = output_dir / f"{folder_name}_{chapter_dir.name}_temp"
-        temp_json_dir.mkdir(exist_ok=True)
-        
-        # Get all image files in this chapter
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']
-        image_files = []
-        
-        for ext in image_extensions:
-            image_files.extend(chapter_dir.glob(f"*{ext}"))
-            image_files.extend(chapter_dir.glob(f"*{ext.upper()}"))
-        
-        # Sort files for consistent processing
-        image_files.sort()
-        
-        if not image_files:
-            print(f"   ⚠️  No image files found in {chapter_dir.name}")
-            continue
-        
-        print(f"   Found {len(image_files)} image files in {chapter_dir.name}")
-        
-        # Process each image in this chapter
-        json_files = []
-        successful_images = 0
-        
-        for image_file in image_files:
-            success, json_file = process_image_with_magi(image_file, temp_json_dir)
-            if success and json_file and json_file.exists():
-                json_files.append(json_file)
-                successful_images += 1
-            else:
-                print(f"   ⚠️  Failed to process {image_file.name}")
-        
-        print(f"   Successfully processed {successful_images}/{len(image_files)} images in {chapter_dir.name}")
-        
-        if not json_files:
-            print(f"   ❌ No JSON files were generated for {chapter_dir.name}")
-            continue
-        
-        # Combine all JSON files into single JSON for this chapter
-        success = combine_jsons_to_final_json(json_files, chapter_json, temp_json_dir, chapter_dir)
-        
-        if success:
-            successful_chapters += 1
-            print(f"   ✅ Chapter {chapter_dir.name} completed successfully")
-        
-        # Clean up temporary JSON files
-        try:
-            import shutil
-            shutil.rmtree(temp_json_dir)
-            print(f"   🧹 Cleaned up temporary files for {chapter_dir.name}")
-        except Exception as e:
-            print(f"   ⚠️  Could not clean up temp files for {chapter_dir.name}: {e}")
-    
-    print(f"\n📊 Successfully processed {successful_chapters}/{len(chapter_dirs)} chapters")
-    
-    if successful_chapters == 0:
-        print(f"❌ No chapters were processed successfully")
-        return False
+        log.info(f"     - {chapter_dir.name}/")
     
-    # Create a master index file that lists all chapters
-    master_index = {
-        "archive_name": folder_name,
-        "total_chapters": successful_chapters,
-        "chapters": [],
-        "reading_direction": "rtl"
-    }
+    # Process chapters side by side, splitting the --workers magi.py processes between them
+    chapter_workers = max(1, min(workers, len(chapter_dirs)))
+    per_chapter_workers = max(1, workers // chapter_workers)
     
-    for chapter_dir in chapter_dirs:
-        chapter_json = output_dir / f"{folder_name}_{chapter_dir.name}.json"
-        if chapter_json.exists():
-            # Read the chapter JSON to get page count
-            try:
-                with open(chapter_json, 'r', encoding='utf-8') as f:
-                    chapter_data = json.load(f)
-                master_index["chapters"].append({
-                    "name": chapter_dir.name,
-                    "json_file": f"{folder_name}_{chapter_dir.name}.json",
-                    "total_pages": chapter_data.get("total_pages", 0)
-                })
-            except Exception as e:
-                print(f"   ⚠️  Could not read chapter JSON for {chapter_dir.name}: {e}")
+    # Built once here, shared by the chapter workers and the master index entries
+    chapter_json_paths = {chapter_dir.name: output_dir / f"{folder_name}_{chapter_dir.name}.json"
+                          for chapter_dir in chapter_dirs}
     
-    # Write master index
+    # Stream the master index: one entry per chapter as it completes, renamed into place at the end
     master_json = output_dir / f"{folder_name}.json"
+    partial_json = output_dir / f"{folder_name}.json.part"
+    successful_chapters = 0
     try:
-        with open(master_json, 'w', encoding='utf-8') as f:
-            json.dump(master_index, f, indent=2, ensure_ascii=False)
-        print(f"✅ Created master index: {master_json}")
-        return True
+        with open(partial_json, 'w', encoding='utf-8') as f, ThreadPoolExecutor(max_workers=chapter_workers) as pool:
+            f.write('{"archive_name":%s,"reading_direction":"rtl","chapters":[' % compact_json(folder_name))
+            # pool.map yields in chapter order; page counts come straight from the combine step
+            results = pool.map(lambda chapter_dir: process_chapter(chapter_dir, chapter_json_paths[chapter_dir.name],
+                                                                   per_chapter_workers),
+                               chapter_dirs)
+            for (name, chapter_json), (success, total_pages) in zip(chapter_json_paths.items(), results):
+                if not success:
+                    continue
+                if successful_chapters:
+                    f.write(',')
+                f.write(compact_json({
+                    "name": name,
+                    "json_file": chapter_json.name,
+                    "total_pages": total_pages
+                }))
+                successful_chapters += 1
+            f.write('],"total_chapters":%d}' % successful_chapters)
     except Exception as e:
-        print(f"❌ Error writing master index: {e}")
+        log.error(f"❌ Error writing master index: {e}")
+        partial_json.unlink(missing_ok=True)
         return False
+    finally:
+        # Wait for the background cleanup of the chapter temp directories
+        cleanup_queue.join()
+    
+    log.info(f"\n📊 Successfully processed {successful_chapters}/{len(chapter_dirs)} chapters")
+    
+    if successful_chapters == 0:
+        partial_json.unlink()
+        log.error(f"❌ No chapters were processed successfully")
+        return False
+    
+    os.replace(partial_json, master_json)
+    log.info(f"✅ Created master index: {master_json}")
+    return True
+
+def archive_signature(archive_path):
+    """Size and mtime of an archive, written next to its extracted pages once extraction has finished."""
+    st = archive_path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def process_input(input_path, pages_dir, panel_result_dir, workers=DEFAULT_WORKERS, force_extract=False):
+    """Process input path (folder or archive).
 
-def process_input(input_path, pages_dir, panel_result_dir):
-    """Process input path (folder or archive)."""
+    Archives already extracted by an earlier run (matching EXTRACTED_MARKER) are not extracted again
+    unless force_extract is set.
+    """
     input_path = Path(input_path)
     
     if not input_path.exists():
-        print(f"❌ Input path does not exist: {input_path}")
+        log.error(f"❌ Input path does not exist: {input_path}")
         return False
     
     if is_archive(input_path):
@@ -830,55 +1188,124 @@ def process_input(input_path, pages_dir, panel_result_dir):
         extract_folder = pages_dir / input_path.stem
         extract_folder.mkdir(exist_ok=True)
         
-        print(f"📦 Processing archive: {input_path}")
-        if not extract_archive(input_path, extract_folder):
-            return False
+        log.info(f"📦 Processing archive: {input_path}")
+        
+        marker = extract_folder / EXTRACTED_MARKER
+        signature = archive_signature(input_path)
+        try:
+            extracted = not force_extract and marker.read_text() == signature
+        except OSError:
+            extracted = False
+        
+        if extracted:
+            log.info(f"♻️  Reusing pages extracted by a previous run: {extract_folder}")
+        else:
+            # Dropped first so an interrupted extraction is never mistaken for a finished one
+            marker.unlink(missing_ok=True)
+            
+            # Flat CBZ/ZIP: no chapter folders to detect, so detection can start while extracting
+            archive_images = flat_zip_images(input_path) if detect_file_type(input_path) == 'zip' else None
+            if archive_images:
+                log.info(f"📖 Processing as standard archive, streaming pages to MAGI during extraction")
+                success = process_with_magi(extract_folder, panel_result_dir, workers, input_path, archive_images)
+                if success:
+                    marker.write_text(signature)
+                return success
+            
+            if not extract_archive(input_path, extract_folder):
+                return False
+            marker.write_text(signature)
         
         # Check if this is a chapter-based archive (KOReader style)
         if is_chapter_based_archive(extract_folder):
-            print(f"📚 Detected chapter-based archive structure")
-            return process_chapter_based_archive(extract_folder, panel_result_dir)
+            log.info(f"📚 Detected chapter-based archive structure")
+            return process_chapter_based_archive(extract_folder, panel_result_dir, workers)
         else:
-            print(f"📖 Processing as standard archive")
-            return process_with_magi(extract_folder, panel_result_dir)
+            log.info(f"📖 Processing as standard archive")
+            return process_with_magi(extract_folder, panel_result_dir, workers)
         
     elif input_path.is_dir():
         # Check if this is a chapter-based directory
         if is_chapter_based_archive(input_path):
-            print(f"📚 Detected chapter-based directory structure")
-            return process_chapter_based_archive(input_path, panel_result_dir)
+            log.info(f"📚 Detected chapter-based directory structure")
+            return process_chapter_based_archive(input_path, panel_result_dir, workers)
         else:
             # Process folder directly
-            print(f"📁 Processing folder: {input_path}")
-            return process_with_magi(input_path, panel_result_dir)
+            log.info(f"📁 Processing folder: {input_path}")
+            return process_with_magi(input_path, panel_result_dir, workers)
         
     else:
-        print(f"❌ Unsupported input type: {input_path}")
+        log.error(f"❌ Unsupported input type: {input_path}")
         return False
 
+def configure_logging(level):
+    """Send records through a queue so chapter threads never wait on stdout; one listener thread writes them."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description="Process manga folders/archives with MAGI v2")
     parser.add_argument('input', help='Input folder or archive file')
     parser.add_argument('--pages-dir', default='Pages', help='Pages directory name')
     parser.add_argument('--output-dir', default='panel_result', help='Output directory name')
+    parser.add_argument('--verbose', action='store_true', help='Print every normalized panel')
+    parser.add_argument('--quiet', action='store_true', help='Only print errors')
+    parser.add_argument('--workers', type=positive_int, default=DEFAULT_WORKERS,
+                        help=f'Images processed in parallel (default: {DEFAULT_WORKERS}, use 1 on 4GB GPUs)')
+    parser.add_argument('--batch-size', type=positive_int, default=1,
+                        help='Pages per MAGI forward pass (default: 1); raise it if VRAM allows')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run one magi.py --serve daemon for the whole run so the model is loaded once')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Indent the per-folder and per-chapter panel JSON for reading by hand')
+    parser.add_argument('--force-extract', action='store_true',
+                        help='Extract archives again even if a previous run already extracted them')
     
     args = parser.parse_args()
     
-    print("🚀 Manga Processing Script Started")
-    print("=" * 50)
+    level = logging.ERROR if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    configure_logging(level)
+    
+    global PRETTY_JSON
+    PRETTY_JSON = args.pretty
+    
+    if args.batch_size > 1:
+        MAGI_OPTIONS.extend(['--batch-size', str(args.batch_size)])
+    
+    log.info("🚀 Manga Processing Script Started")
+    log.info("=" * 50)
     
     # Create directories
-    pages_dir, panel_result_dir = create_directories()
+    # Relative names are taken relative to the script folder; absolute paths win in the join
+    pages_dir, panel_result_dir = create_directories(SCRIPT_DIR / args.pages_dir, SCRIPT_DIR / args.output_dir)
     
     # Process input
-    success = process_input(args.input, pages_dir, panel_result_dir)
+    daemon = start_magi_daemon() if args.daemon else None
+    try:
+        success = process_input(args.input, pages_dir, panel_result_dir, args.workers, args.force_extract)
+    finally:
+        stop_magi_daemon(daemon)
     
-    print("=" * 50)
+    log.info("=" * 50)
     if success:
-        print("🎉 Processing completed successfully!")
-        print(f"📂 Results in: {panel_result_dir.absolute()}")
+        log.info("🎉 Processing completed successfully!")
+        log.info(f"📂 Results in: {panel_result_dir.absolute()}")
     else:
-        print("❌ Processing failed!")
+        log.error("❌ Processing failed!")
         sys.exit(1)
 
 if __name__ == "__main__":